@@ -1,4 +1,4 @@
 #!/bin/bash
 PYTHONPATH="${PYTHONPATH}:/homes/dr1810/4thYear/individualProject/pythonTypes"
 export PYTHONPATH
-python3 src/main.py $1
+python3 src/main.py "$@"
@@ -174,38 +174,75 @@ OP_BASES = {'Add' : BASE_ADD_TYPES,
             'FloorDiv' : BASE_FLOORDIV_TYPES
            }
 
+class Op_Table():
+    ''' The lookups for one op, worked out from its dict when this module is
+        imported rather than by scanning the dict on every call. Classes are
+        mapped to sets of shared instances, which callers must not change. '''
+    
+    def __init__(self, op_dict):
+        self.op_dict = op_dict
+        # Class -> returns of the pairs with that class on the left/right
+        self.left_returns = self.index(op_dict, lambda x, y, r: (x, r()))
+        self.right_returns = self.index(op_dict, lambda x, y, r: (y, r()))
+        # Class -> types it can be combined with on the other side
+        self.possible_rights = self.index(op_dict, lambda x, y, r: (x, y()))
+        self.possible_lefts = self.index(op_dict, lambda x, y, r: (y, x()))
+        self.symmetrical = [x() for (x, y) in op_dict if y == x or y == Any_Type or x == Any_Type]
+        # (left class, right class) -> returns, filled in as pairs are seen
+        self.pair_returns = {}
+        
+    @staticmethod
+    def index(op_dict, entry):
+        ''' Maps each class to the values entry gives for the pairs it's in,
+            together with those of Any_Type which matches every class. Classes
+            in no pair map to the Any_Type values, held under None. '''
+        table = {}
+        for (x, y), r in op_dict.items():
+            key, value = entry(x, y, r)
+            table.setdefault(key, set()).add(value)
+        any_values = table.get(Any_Type, set())
+        table = {key : frozenset(values | any_values) for key, values in table.items()}
+        table[None] = frozenset(any_values)
+        return table
+    
+    @staticmethod
+    def lookup(table, type_class):
+        if type_class in table:
+            return table[type_class]
+        return table[None]
+    
+    def get_pair_returns(self, left_class, right_class):
+        pair = (left_class, right_class)
+        if pair not in self.pair_returns:
+            return_type = set()
+            for key in [pair, (Any_Type, right_class), (left_class, Any_Type)]:
+                if key in self.op_dict:
+                    return_type.add(self.op_dict[key]())
+            self.pair_returns[pair] = frozenset(return_type)
+        return self.pair_returns[pair]
+
+OP_TABLES = {op : Op_Table(op_dict) for op, op_dict in OP_DICTS.items()}
+
+# (op, left classes, right classes) -> returns of every combination
+COMBINED_RETURNS = {}
+
 def get_left_return_types(op, left_type):
     ''' Takes a single left type and an op and returns all possible return types '''
-    op_dict = OP_DICTS[op]
-    possible_combos = [(x, y) for (x, y) in op_dict if x == left_type.__class__ or x == Any_Type]
-    return_types = [op_dict[x]() for x in possible_combos]
-    return set(return_types)
+    return Op_Table.lookup(OP_TABLES[op].left_returns, left_type.__class__)
 
 def get_right_return_types(op, right_type):
     ''' Takes a single right type and an op and returns all possible return
         types. '''
-    op_dict = OP_DICTS[op]
-    possible_combos = [(x, y) for (x, y) in op_dict if y == right_type.__class__ or y == Any_Type]
-    return_types = [op_dict[x]() for x in possible_combos]
-    return set(return_types)
+    return Op_Table.lookup(OP_TABLES[op].right_returns, right_type.__class__)
 
 def get_possible_right_types(op, left_type):
-    op_dict = OP_DICTS[op]
-    possible_rights = [y for (x, y) in op_dict if x == left_type.__class__ or x == Any_Type]
-    return_types = [x() for x in possible_rights]
-    return set(return_types)
+    return Op_Table.lookup(OP_TABLES[op].possible_rights, left_type.__class__)
 
 def get_possible_left_types(op, right_type):
-    op_dict = OP_DICTS[op]
-    possible_lefts = [x for (x, y) in op_dict if y == right_type.__class__ or y == Any_Type]
-    return_types = [x() for x in possible_lefts]
-    return set(return_types)
+    return Op_Table.lookup(OP_TABLES[op].possible_lefts, right_type.__class__)
 
 def get_symmetrical_types(op):
-    op_dict = OP_DICTS[op]
-    possible_types = [x for (x, y) in op_dict if y == x or y == Any_Type or x == Any_Type]
-    return_types = [x() for x in possible_types]
-    return BasicTypeVariable(return_types)
+    return BasicTypeVariable(OP_TABLES[op].symmetrical)
 
 def get_all_right_types(op, left_types):
     ''' Takes a number of left types and returns all possible right types. '''
@@ -224,21 +261,28 @@ def get_all_left_types(op, right_types):
     return BasicTypeVariable(list(return_types))
 
 def get_return_type(op, left_type, right_type):
-    return_type = set()
-    op_dict = OP_DICTS[op]
-    if (left_type.__class__, right_type.__class__) in op_dict:
-        r_type = op_dict[(left_type.__class__, right_type.__class__)]
-        return_type.add(r_type())
-    if (Any_Type, right_type.__class__) in op_dict:
-        r_type = op_dict[(Any_Type, right_type.__class__)]
-        return_type.add(r_type())
-    if (left_type.__class__, Any_Type) in op_dict:
-        r_type = op_dict[(left_type.__class__, Any_Type)]
-        return_type.add(r_type())
-    return return_type
+    return OP_TABLES[op].get_pair_returns(left_type.__class__, right_type.__class__)
+
+def get_combined_return_types(op, left_types, right_types):
+    ''' The types every combination of left and right types can result in.
+        Only the classes of the types matter so answers are cached by them. '''
+    key = (op, frozenset(t.__class__ for t in left_types), frozenset(t.__class__ for t in right_types))
+    if key not in COMBINED_RETURNS:
+        extracted = set()
+        for left in key[1]:
+            for right in key[2]:
+                if left is Any_Type and right is Any_Type:
+                    extracted.add(Any_Type())
+                    continue
+                if left is Any_Type:
+                    extracted |= Op_Table.lookup(OP_TABLES[op].right_returns, right)
+                    continue
+                if right is Any_Type:
+                    extracted |= Op_Table.lookup(OP_TABLES[op].left_returns, left)
+                    continue
+                extracted |= OP_TABLES[op].get_pair_returns(left, right)
+        COMBINED_RETURNS[key] = frozenset(extracted)
+    return COMBINED_RETURNS[key]
 
 def get_op_types(op):
     return OP_BASES[op]
-
-
-print(get_all_left_types('Add', BasicTypeVariable([Int_Type(), Float_Type()])))
\ No newline at end of file
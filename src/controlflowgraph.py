@@ -4,8 +4,11 @@ Creates a control flow graph (cfg)
 
 from src.traversers.astfulltraverser import AstFullTraverser
 import ast
+import logging
 from pprint import pprint
 
+log = logging.getLogger(__name__)
+
 class Block():
     ''' A basic control flow block.
 
@@ -16,6 +19,11 @@ class Block():
     # Block tags
     NORMAL = 0
     LOOP_HEADER = 1
+    
+    # Every statement of every function has a block, so they are kept
+    # without a __dict__.
+    __slots__ = ('next_block', 'next', 'has_return', 'start_line_no', 'statements', 'exit_blocks',
+                 'tag', 'merged_into')
 
     def __init__(self):
         # The next block along the function
@@ -25,38 +33,84 @@ class Block():
         self.start_line_no = 0
         self.statements = []
         self.exit_blocks = set()
-        self.predecessors = []
-        # Use to indicate whether the block has been visited. Used for printing
-        self.marked = False
-        self.ssa_mark = False
-        self.ssa_prepro_mark = False
-        self.has_phi_nodes = False
         # Used to describe special blocks
         self.tag = Block.NORMAL
-        # Block which have been absorbed into this one
-        self.dependents = []
-        
-        self.referenced_vars = set()
-        self.block_dict = {}
-        # Used in SSA - Holds dicts on entry to block
-        self.entry_dicts = []
+        # The block this one has been absorbed into
+        self.merged_into = None
         
     def __repr__(self):
         return str(self.start_line_no)
         
-    def copy_dict(self, copy_to):
-        ''' Keep the name bindings but copy the class instances.
-            Both bindings now point to the same variables.
-            This function is used to simulate C pointers.
-            The predecessor information is overwritten so we need to carry
-            this over.
-            TODO: Find a more elegant way of achieving this. '''
-        for dependent in self.dependents:
-     #       copy_to.predecessors += dependent.predecessors
-            dependent.__dict__ = copy_to.__dict__
-    #    copy_to.predecessors += self.predecessors
-        copy_to.dependents += self.dependents + [self]
-        self.__dict__ = copy_to.__dict__
+    def merge_into(self, block):
+        ''' This block is empty and leads straight to block, so the two
+            become one. The block is used in place of this one from now on.
+            Exits already pointing here are followed over when the finished
+            graph is made into a Compact_CFG. '''
+        self.merged_into = block
+        
+    def resolve(self):
+        ''' Returns the block standing in for this one. '''
+        block = self
+        while block.merged_into is not None:
+            block = block.merged_into
+        return block
+
+class Compact_CFG():
+    ''' The finished control flow graph of a module or function. The blocks
+        reachable from the entry are numbered from 0, the entry, and the
+        rest follow in the order they were made. Every block is a range of
+        one flat list of statements and its edges are tuples of numbers, so
+        passes over the graph only need to index lists. '''
+
+    __slots__ = ('statements', 'statement_starts', 'start_line_nos', 'successors', 'predecessors',
+                 'exit', 'phi_nodes')
+
+    def __init__(self, entry, blocks):
+        ''' Numbers the blocks of the graph made of blocks starting at the
+            Block entry. Merged blocks are followed to those standing in for
+            them. '''
+        reachable = {entry}
+        to_visit = [entry]
+        while to_visit:
+            for an_exit in to_visit.pop().exit_blocks:
+                an_exit = an_exit.resolve()
+                if an_exit not in reachable:
+                    reachable.add(an_exit)
+                    to_visit.append(an_exit)
+        ordered = [entry] + [block for block in blocks if block in reachable and block is not entry]
+        numbers = {block : i for i, block in enumerate(ordered)}
+
+        self.statements = []
+        # Block i holds statements[statement_starts[i]:statement_starts[i + 1]]
+        self.statement_starts = []
+        self.start_line_nos = []
+        self.successors = []
+        predecessors = [[] for _ in ordered]
+        # The number of the block leaving the function, if it can be reached
+        self.exit = None
+        for i, block in enumerate(ordered):
+            self.statement_starts.append(len(self.statements))
+            self.statements.extend(block.statements)
+            self.start_line_nos.append(block.start_line_no)
+            if block.start_line_no == "Exit":
+                self.exit = i
+            successors = tuple(sorted({numbers[an_exit.resolve()] for an_exit in block.exit_blocks}))
+            self.successors.append(successors)
+            for successor in successors:
+                predecessors[successor].append(i)
+        self.statement_starts.append(len(self.statements))
+        self.predecessors = [tuple(block_predecessors) for block_predecessors in predecessors]
+        # The phi nodes at the head of each block, given by SSA_Traverser
+        self.phi_nodes = [()] * len(ordered)
+
+    def __len__(self):
+        return len(self.start_line_nos)
+
+    def block_statements(self, block):
+        return self.statements[self.statement_starts[block]:self.statement_starts[block + 1]]
+
+    def is_empty(self, block):
+        return self.statement_starts[block] == self.statement_starts[block + 1]
         
 # These are frame blocks.
 # Idea for these are from PyPy
@@ -74,7 +128,10 @@ class ControlFlowGraph(AstFullTraverser):
         self.eliminate_dead_code = False
         # Used to hold how control flow is nested (e.g. if inside of a for)
         self.frame_blocks = []
+        self.exit_block = None
         self.current_line_num = 0
+        # The blocks of the module or function being built
+        self.blocks = []
         
     def parse_ast(self, source_ast):
         self.run(source_ast)
@@ -116,13 +173,17 @@ class ControlFlowGraph(AstFullTraverser):
             then the after blocks will be empty. All body/then/else exits will
             point to this block. If it is empty then swap for the given block.
             If it is not then set that block's exit as the given block. '''
+        candidate_block = candidate_block.resolve()
         if candidate_block.has_return:
             # If the block has a return exit then can not be given another here
             return
         if self.is_empty_block(candidate_block):
-            # candidate_block and after_control_block now point to the same
-            # variables. They are now the same instance.
-            candidate_block.copy_dict(after_control_block)
+            # candidate_block is replaced by after_control_block
+            after_control_block = after_control_block.resolve()
+            if candidate_block is not after_control_block:
+                candidate_block.merge_into(after_control_block)
+                if self.current_block is candidate_block:
+                    self.current_block = after_control_block
             return
         # This is needed to avoid two "Exits" appearing for the return or yield
         # at the end of a function.
@@ -185,11 +246,13 @@ class ControlFlowGraph(AstFullTraverser):
         
     def new_block(self):
         ''' From pypy. '''
-        return Block()
+        block = Block()
+        self.blocks.append(block)
+        return block
 
     def use_block(self, block):
         ''' From pypy. '''
-        self.current_block = block
+        self.current_block = block.resolve()
         
     def empty_block(self, block):
         return not block.statements
@@ -199,12 +262,12 @@ class ControlFlowGraph(AstFullTraverser):
            From pypy """
         if block is None:
             block = self.new_block()
-        self.current_block.next_block = block
+        self.current_block.resolve().next_block = block
         self.use_block(block)
         return block
     
     def add_to_exits(self, source, dest):
-        source.exit_blocks.add(dest)
+        source.resolve().exit_blocks.add(dest.resolve())
    #     dest.predecessors.append(source)
         
     def visit(self, node):
@@ -213,8 +276,7 @@ class ControlFlowGraph(AstFullTraverser):
             return
         self.check_block_num(node)
         self.add_to_block(node)
-        method = getattr(self, 'do_' + node.__class__.__name__)
-        return method(node)
+        return self.dispatch_table[node.__class__](self, node)
 
     def check_block_num(self, node):
         ''' Used for display purposes only. Each block is labelled with the
@@ -231,21 +293,27 @@ class ControlFlowGraph(AstFullTraverser):
                self.eliminate_dead_code
     
     def do_Module(self, node):
+        self.blocks = []
         block = self.new_block()
         self.use_block(block)
-        node.initial_block = block
         self.exit_block = self.new_block()
         # Special case
         self.exit_block.start_line_no = "Exit"
         for z in node.body:
             self.visit(z)
+        node.cfg = Compact_CFG(block.resolve(), self.blocks)
 
     def do_FunctionDef(self, node):
         old_block = self.current_block
+        old_blocks = self.blocks
+        old_exit_block = self.exit_block
+        old_frame_blocks = self.frame_blocks
+        # The function's graph can't lead into the blocks of its parent
+        self.blocks = []
+        self.frame_blocks = []
         try:
             block = self.new_block()
             self.use_block(block)
-            node.initial_block = block
             self.exit_block = self.new_block()
             # Special case
             self.exit_block.start_line_no = "Exit"
@@ -255,11 +323,15 @@ class ControlFlowGraph(AstFullTraverser):
             # Such as yields and returns
             for e in self.current_block.exit_blocks:
                 if e.start_line_no == "Exit":
-                    return
+                    break
             else:
                 self.check_child_exits(self.current_block, self.exit_block)
+            node.cfg = Compact_CFG(block.resolve(), self.blocks)
         finally:
             self.current_block = old_block
+            self.blocks = old_blocks
+            self.exit_block = old_exit_block
+            self.frame_blocks = old_frame_blocks
             
     def do_If(self, node):
         ''' If an if statement is the last in a straight line then an empty
@@ -358,14 +430,14 @@ class ControlFlowGraph(AstFullTraverser):
         ''' Continues can not be in a finally block.
             TODO: Fix this up.  '''
         if not self.frame_blocks:
-            print("Line " + str(node.lineno) + " 'continue' not inside of a loop")
+            log.warning("Line %s 'continue' not inside of a loop", node.lineno)
             return
         
         f_type, block = self.frame_blocks[-1]
         if f_type == F_BLOCK_LOOP:
             self.add_to_exits(self.current_block, block)
         elif f_type == F_BLOCK_FINALLY_END:
-            print("Line " + str(node.lineno) + " 'continue' not supported inside 'finally' clause")
+            log.warning("Line %s 'continue' not supported inside 'finally' clause", node.lineno)
         else:
             # Find the loop
             stack_block = None
@@ -389,7 +461,7 @@ class ControlFlowGraph(AstFullTraverser):
                         self.add_to_exits(self.current_block, block)
                     break
             else:
-                print("Line " + str(node.lineno) + " 'continue' not inside of a loop")
+                log.warning("Line %s 'continue' not inside of a loop", node.lineno)
                 return
         self.current_block.has_return = True
     
@@ -414,7 +486,7 @@ class ControlFlowGraph(AstFullTraverser):
                     self.add_to_exits(stack_block, f_block)
                     stack_block = f_block
         else:
-            print("Line " + str(node.lineno) + " 'break' not inside of a loop")
+            log.warning("Line %s 'break' not inside of a loop", node.lineno)
         self.current_block.has_return = True
         
     def do_Yield(self, node):
@@ -675,38 +747,27 @@ class PrintCFG(AstFullTraverser):
     def run(self, node):
         self.visit(node)
         
-    def visit(self, node):
-        '''Visit a single node. Callers are responsible for visiting children.'''
-        method = getattr(self, 'do_' + node.__class__.__name__)
-        return method(node)
-    
     def do_Module(self, node):
       #  print("CFG for Module code")
-        self.process_blocks(node.initial_block)
+        self.process_blocks(node.cfg)
         for z in node.body:
             self.visit(z)
     
     def do_FunctionDef(self, node):
     #    print("CFG for " + node.name)
     #    print(node.lineno)
-        self.process_blocks(node.initial_block)
-        
-    def process_blocks(self, block):
-        ''' TODO: Handle infinite loops '''
-        if block.marked:
-            return
-        if block.start_line_no == "Exit":
-            return
-        pred_nos = [block.start_line_no for block in block.predecessors]
-        exit_nos = [block.start_line_no for block in block.exit_blocks]
-    #    pprint("Block starting at: " + str(block.start_line_no) + " to " + str(exit_nos))
-    #    pprint("Block starting at: " + str(block.start_line_no) + " preceded by " + str(pred_nos))
-     #   print(block.statements)
-        block.marked = True
-        for an_exit in block.exit_blocks:
-            self.process_blocks(an_exit)
-        if block.next_block:
-            self.process_blocks(block.next_block)
+        self.process_blocks(node.cfg)
+        
+    def process_blocks(self, cfg):
+        line_nos = cfg.start_line_nos
+        for block in range(len(cfg)):
+            if block == cfg.exit:
+                continue
+            pred_nos = [line_nos[predecessor] for predecessor in cfg.predecessors[block]]
+            exit_nos = [line_nos[an_exit] for an_exit in cfg.successors[block]]
+        #    pprint("Block starting at: " + str(line_nos[block]) + " to " + str(exit_nos))
+        #    pprint("Block starting at: " + str(line_nos[block]) + " preceded by " + str(pred_nos))
+         #   print(cfg.block_statements(block))
     
         
         
@@ -0,0 +1,89 @@
+''' Dominators of a control flow graph, as used to put a function into SSA
+    form. The graph is given by a list of its nodes in reverse postorder,
+    the entry coming first, and a mapping from every node to the list of
+    its predecessors, e.g. a list when the nodes are the numbers of the
+    blocks of a Compact_CFG. '''
+
+def reverse_postorder(entry, successors):
+    ''' The nodes reachable from entry in reverse postorder. successors maps
+        a node to the list of nodes it leads to. '''
+    postorder = []
+    seen = {entry}
+    stack = [(entry, iter(successors(entry)))]
+    while stack:
+        node, to_visit = stack[-1]
+        for successor in to_visit:
+            if successor not in seen:
+                seen.add(successor)
+                stack.append((successor, iter(successors(successor))))
+                break
+        else:
+            stack.pop()
+            postorder.append(node)
+    postorder.reverse()
+    return postorder
+
+def immediate_dominators(nodes, predecessors):
+    ''' Maps every node to its immediate dominator, the entry to itself. Uses
+        the iterative algorithm of Cooper, Harvey and Kennedy. '''
+    position = {node : i for i, node in enumerate(nodes)}
+    entry = nodes[0]
+    idom = {entry : entry}
+
+    def intersect(first, second):
+        while first != second:
+            while position[first] > position[second]:
+                first = idom[first]
+            while position[second] > position[first]:
+                second = idom[second]
+        return first
+
+    changed = True
+    while changed:
+        changed = False
+        for node in nodes[1:]:
+            new_idom = None
+            for predecessor in predecessors[node]:
+                if predecessor not in idom:
+                    continue
+                new_idom = predecessor if new_idom is None else intersect(predecessor, new_idom)
+            if idom.get(node) != new_idom:
+                idom[node] = new_idom
+                changed = True
+    return idom
+
+def dominance_frontiers(nodes, predecessors, idom):
+    ''' Maps every node to the set of nodes where its dominance ends, being
+        those with a predecessor it dominates that it doesn't strictly
+        dominate itself. The entry is also entered from outside the graph
+        so it's in the frontier of anything looping back to it. '''
+    frontiers = {node : set() for node in nodes}
+    for node in nodes:
+        if len(predecessors[node]) < 2 and node != nodes[0]:
+            continue
+        for predecessor in predecessors[node]:
+            runner = predecessor
+            while runner != idom[node]:
+                frontiers[runner].add(node)
+                runner = idom[runner]
+    return frontiers
+
+def dominator_tree(nodes, idom):
+    ''' Maps every node to the list of nodes it immediately dominates, in the
+        order of nodes. '''
+    children = {node : [] for node in nodes}
+    for node in nodes[1:]:
+        children[idom[node]].append(node)
+    return children
+
+def iterated_frontier(frontiers, nodes):
+    ''' The nodes reached by repeatedly taking the dominance frontier of
+        nodes, i.e. where the definitions made in nodes meet. '''
+    reached = set()
+    to_visit = list(nodes)
+    while to_visit:
+        for frontier_node in frontiers[to_visit.pop()]:
+            if frontier_node not in reached:
+                reached.add(frontier_node)
+                to_visit.append(frontier_node)
+    return reached
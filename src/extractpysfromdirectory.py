@@ -1,11 +1,19 @@
 import os
+from multiprocessing import Pool
+
 from src.pyfile import PyFile
+from src.treepickler import dumps_tree, loads_tree
+from src.treecache import TreeCache
 
-def get_pys(top_level):
+def get_pys(top_level, jobs = 1, cache_dir = None):
     ''' Returns a dict which has a directories as keys and maps to a list of
-        dicts with file names as keys and maps to the corresponding PyFiles. '''
+        dicts with file names as keys and maps to the corresponding PyFiles.
+        If jobs is more than one the files are prepared in a pool of that many
+        processes. If cache_dir is given prepared files are cached there. '''
     py_files = {}
+    cache = TreeCache(os.path.abspath(cache_dir)) if cache_dir else None
     os.chdir(top_level)
+    to_prepare = []
     for root, dirs, files in os.walk(top_level):
         # Remove those beginning with an underscore
         files_no_underscore = [x for x in files if x[0] != "_"]
@@ -15,6 +23,28 @@ def get_pys(top_level):
         relative_root = os.path.relpath(root, top_level)
         py_files[relative_root] = {}
         for py_name in py_names:
-            py_file = PyFile(py_name, relative_root, root + "/" + py_name + ".py")
-            py_files[relative_root][py_name] = py_file
-    return py_files
\ No newline at end of file
+            to_prepare.append((py_name, relative_root, root + "/" + py_name + ".py", cache))
+
+    if jobs > 1 and len(to_prepare) > 1:
+        prepared = prepare_in_pool(to_prepare, jobs)
+    else:
+        prepared = [PyFile(*args) for args in to_prepare]
+
+    for py_file in prepared:
+        py_files[py_file.get_path()][py_file.get_name()] = py_file
+    return py_files
+
+def prepare_in_pool(to_prepare, jobs):
+    ''' Runs the per-file front end in worker processes. None of the passes
+        look at another file so the prepared trees are pickled and sent back
+        for the cross-module type inference. '''
+    # Enough chunks to keep the workers balanced without paying a round trip
+    # per file.
+    chunk_size = max(1, len(to_prepare) // (jobs * 4))
+    with Pool(jobs) as pool:
+        # Unpickle in the parent while the workers carry on.
+        return [loads_tree(data) for data in pool.imap(prepare_pickled, to_prepare, chunk_size)]
+
+def prepare_pickled(args):
+    ''' Worker side of prepare_in_pool. '''
+    return dumps_tree(PyFile(*args))
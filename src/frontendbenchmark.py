@@ -0,0 +1,134 @@
+''' Compares the per-file front end with the SSA preprocessing run as a pass
+    of its own against it being fused into the preprocessing walk. Counts
+    the nodes each pass visits and times the phases over every file in a
+    directory, e.g.
+
+        python3 src/frontendbenchmark.py some/project -r 5
+
+    Also checks that both give the same prepared trees. '''
+
+import argparse
+import ast
+import collections
+import logging
+import os
+import sys
+
+from src.pyfile import PyFile
+from src.preprocessing import Preprocessor
+from src.controlflowgraph import ControlFlowGraph
+from src.traversers.ssapreprocessor import SSA_Pre_Processor
+from src.traversers.ssatraverser import SSA_Traverser
+from src.preprocessingsecond import PreprocessorSecond
+
+# Every node a pass walks goes through its visit, which some of these
+# inherit from AstFullTraverser
+PASSES = [Preprocessor, ControlFlowGraph, SSA_Pre_Processor, SSA_Traverser, PreprocessorSecond]
+
+def count_visits(visit_counts):
+    ''' Makes every pass count its visits in visit_counts, keyed by the name
+        of the class doing the visiting. The counting visit is set on each
+        class itself, so an inherited visit is only counted for the class
+        walking. Returns the visits each class defined itself, or None. '''
+    originals = {}
+    for pass_class in PASSES:
+        originals[pass_class] = pass_class.__dict__.get('visit')
+        def counting_visit(self, node, visit = pass_class.visit):
+            visit_counts[self.__class__.__name__] += 1
+            return visit(self, node)
+        pass_class.visit = counting_visit
+    return originals
+
+def stop_counting(originals):
+    ''' Puts back the visits count_visits replaced. '''
+    for pass_class, visit in originals.items():
+        if visit is None:
+            del pass_class.visit
+        else:
+            pass_class.visit = visit
+
+def find_py_files(top_level):
+    py_files = []
+    for root, dirs, files in os.walk(top_level):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".py") and name[0] != "_":
+                py_files.append((name[:-3], os.path.relpath(root, top_level), os.path.join(root, name)))
+    return py_files
+
+def prepare_all(py_files, fused, repeats):
+    ''' Prepares every file repeats times. Returns the node visits of one
+        round and the total wall time of each phase. '''
+    visit_counts = collections.Counter()
+    phase_times = collections.Counter()
+    originals = count_visits(visit_counts)
+    try:
+        for name, relative_path, path in py_files:
+            PyFile(name, relative_path, path, None, fused)
+    finally:
+        stop_counting(originals)
+    for _ in range(repeats):
+        for name, relative_path, path in py_files:
+            py_file = PyFile(name, relative_path, path, None, fused)
+            for phase, timings in py_file.phase_timings.items():
+                phase_times[phase] += timings['wall']
+    return visit_counts, phase_times
+
+def tree_outline(root):
+    ''' The tree with its names renamed, along with what the SSA passes
+        noted of every function: its phi nodes and the names it stores to. '''
+    outline = [ast.dump(root)]
+    for node in ast.walk(root):
+        if isinstance(node, ast.FunctionDef):
+            phis = [[(phi.get_var(), sorted(phi.get_targets())) for phi in block_phis]
+                    for block_phis in node.cfg.phi_nodes]
+            names = [sorted(getattr(node, attribute, ["not noted"]))
+                     for attribute in ("local_variables", "func_global_stores", "global_var_edits")]
+            outline.append((node.lineno, node.name, phis, names))
+    return outline
+
+def differing_files(py_files):
+    ''' The paths of the files whose trees differ between the two ways of
+        preparing them. '''
+    differing = []
+    for name, relative_path, path in py_files:
+        separate = PyFile(name, relative_path, path, None, False).get_source()
+        fused = PyFile(name, relative_path, path, None, True).get_source()
+        if tree_outline(separate) != tree_outline(fused):
+            differing.append(path)
+    return differing
+
+def report(title, visit_counts, phase_times):
+    print(title)
+    for pass_name, visits in sorted(visit_counts.items()):
+        print("  %-22s %9d visits" % (pass_name, visits))
+    print("  %-22s %9d visits" % ("total", sum(visit_counts.values())))
+    for phase, wall in sorted(phase_times.items()):
+        print("  %-22s %9.3fs" % (phase, wall))
+    print("  %-22s %9.3fs" % ("front end", front_end_time(phase_times)))
+
+def front_end_time(phase_times):
+    ''' Everything after parsing, which is the same either way. '''
+    return sum(wall for phase, wall in phase_times.items() if phase != "parse")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the fused front end against running each pass separately.")
+    parser.add_argument("directory", help="The top level directory of the Python files to prepare.")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+                        help="Number of times every file is prepared for the timings.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    py_files = find_py_files(args.directory)
+    separate_visits, separate_times = prepare_all(py_files, False, args.repeats)
+    fused_visits, fused_times = prepare_all(py_files, True, args.repeats)
+    print("%d files, timings over %d rounds" % (len(py_files), args.repeats))
+    report("Separate passes:", separate_visits, separate_times)
+    report("Fused:", fused_visits, fused_times)
+    saved_visits = sum(separate_visits.values()) - sum(fused_visits.values())
+    print("Node visits saved: %d (%.1f%%)" % (saved_visits, 100.0 * saved_visits / sum(separate_visits.values())))
+    print("Front end time saved: %.1f%%" % (100.0 * (1 - front_end_time(fused_times) / front_end_time(separate_times))))
+    differing = differing_files(py_files)
+    for path in differing:
+        print("Prepared trees differ: %s" % path)
+    sys.exit(1 if differing else 0)
@@ -25,8 +25,6 @@ class AllStatementsPseudoGenerator(AllStatementsTraverser):
         pass
 
     def visit(self,node):
-        assert isinstance(node,ast.AST),node.__class__.__name__
-        method_name = 'do_' + node.__class__.__name__
-        method = getattr(self,method_name,self.default_visitor)
+        method = self.dispatch_table[node.__class__]
         self.result.append(node)
-        method(node)
+        method(self,node)
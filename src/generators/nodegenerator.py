@@ -1,6 +1,8 @@
 import ast
 
-class NodeGenerator:
+from src.traversers.astbasetraverser import Dispatching
+
+class NodeGenerator(metaclass=Dispatching):
     
     # def __init__(self):
         # pass
@@ -14,11 +16,9 @@ class NodeGenerator:
     #@+node:ekr.20130318065046.9310: *4* visit
     def visit(self,node):
 
-        assert isinstance(node,ast.AST),node.__class__.__name__
-        method_name = 'do_' + node.__class__.__name__
-        method = getattr(self,method_name)
+        method = self.dispatch_table[node.__class__]
         yield node
-        for node2 in method(node):
+        for node2 in method(self,node):
             yield node2
             
     # Avoid the overhead of an extra layer.
@@ -65,7 +65,7 @@ class ImportFrom():
         self.level = level
     
     def convert_to_directories(self, path):
-        return self.path.split('.')
+        return path.split('.')
     
     def get_as_name(self):
         if self.as_name:
@@ -73,7 +73,11 @@ class ImportFrom():
         else:
             return self.item
 
-    def find(self, file_tree, current_dir):
+    def locate(self, file_tree, current_dir):
+        ''' Returns the (directory, module name) key of the module this
+            import reads from and whether the item is that module itself, or
+            None if it can't be found. Does not change the import. '''
+        path = self.path
         if self.level:
             # Rolls back the dir for every level - 1
             for _ in range(self.level - 1):
@@ -83,27 +87,30 @@ class ImportFrom():
                 else:
                     current_dir.pop()
                 current_dir = '/'.join(current_dir)
-            self.path = current_dir + "." + self.path
-            
-        if self.as_name == "kp":
-            pass
+            path = current_dir + "." + path
             
-        path = self.convert_to_directories(self.path)
+        path = self.convert_to_directories(path)
         module_name = path.pop()
         path  = '/'.join(path)
         if not path:
             path = "."
                 
         if self.item == "*":
-            return self.do_wildcard_imports(file_tree, current_dir, path, module_name)
+            if not path:
+                concat_path = current_dir
+            else:
+                concat_path = '/'.join(path)
+            if concat_path in file_tree and module_name in file_tree[concat_path]:
+                return (concat_path, module_name), True
+            # What do we do here?
+            return None
         
         # Regular import - first check if its a item
         if path in file_tree:
             if module_name in file_tree[path]:
                 module = file_tree[path][module_name].get_module_type()
-                module_vars = module.get_vars()
-                if self.item in module_vars:
-                    return [(self.get_as_name(), module_vars[self.item])]
+                if self.item in module.get_vars():
+                    return (path, module_name), False
                 
         # Now try to get the module
         if path == ".":
@@ -113,33 +120,34 @@ class ImportFrom():
         module_name = self.item
         if path in file_tree:
             if module_name in file_tree[path]:
-                module = file_tree[path][module_name].get_module_type()
-                return [(self.get_as_name(), BasicTypeVariable([module]))]
-        
-        
-        # Give up
-        return [(self.get_as_name(), BasicTypeVariable([Any_Type()]))]
+                return (path, module_name), True
+        return None
+    
+    def resolve(self, file_tree, current_dir):
+        ''' Returns the keys of the modules this import depends on. '''
+        location = self.locate(file_tree, current_dir)
+        return [location[0]] if location else []
 
-       
-    def do_wildcard_imports(self, file_tree, current_dir, path, module_name):
-        
-        if not path:
-            concat_path = current_dir
-        else:
-            concat_path = '/'.join(path)
+    def find(self, file_tree, current_dir):
+        location = self.locate(file_tree, current_dir)
         
-        if concat_path in file_tree:
-            if module_name in file_tree[concat_path]:
-                module = file_tree[concat_path][module_name].get_module_type()
-                module_vars = module.get_vars()
-                return [(name, var) for name, var in module_vars.items()]
-            else:
+        if self.item == "*":
+            if not location:
                 return []
-        else:
-            # What do we do here?
-            return []
+            (path, module_name), _ = location
+            module = file_tree[path][module_name].get_module_type()
+            module_vars = module.get_vars()
+            return [(name, var) for name, var in module_vars.items()]
         
-            
+        if location:
+            (path, module_name), is_module = location
+            module = file_tree[path][module_name].get_module_type()
+            if is_module:
+                return [(self.get_as_name(), BasicTypeVariable([module]))]
+            return [(self.get_as_name(), module.get_vars()[self.item])]
+        
+        # Give up
+        return [(self.get_as_name(), BasicTypeVariable([Any_Type()]))]
         
     
 class Import():
@@ -161,32 +169,42 @@ class Import():
             return self.as_name
         return self.convert_to_directories(self.path)[0]
     
-    def find(self, dirs, current_dir):
+    def locate(self, dirs, current_dir):
+        ''' Returns the (directory, module name) key of the imported module
+            or None if it can't be found. '''
         path = self.convert_to_directories(self.path)
         
         if len(path) == 1:
             # Top level
             file_in_dir = path[0]
-            as_name = self.as_name if self.as_name else file_in_dir
             if file_in_dir in dirs[current_dir]:
-                return [(as_name, BasicTypeVariable([dirs[current_dir][file_in_dir].get_module_type()]))]
-            else:
-                # Can't find it
-                return [(as_name, BasicTypeVariable([Any_Type()]))]
+                return (current_dir, file_in_dir)
+            return None
         elif self.as_name:
             # We can just grab the module/package
             # Check module first
             name = path.pop()
             path_to_module = '/'.join(path)
-                
-            if path_to_module not in dirs:
-                return [(self.as_name, BasicTypeVariable([Any_Type()]))]
-                
-            return_type = None
-            if name in dirs[path_to_module]:
-                return [(self.as_name, BasicTypeVariable([dirs[path_to_module][name].get_module_type()]))]
-            else:
-                return [(self.as_name, BasicTypeVariable([Any_Type()]))]
+            if path_to_module in dirs and name in dirs[path_to_module]:
+                return (path_to_module, name)
+        return None
+    
+    def resolve(self, dirs, current_dir):
+        ''' Returns the keys of the modules this import depends on. '''
+        location = self.locate(dirs, current_dir)
+        return [location] if location else []
+    
+    def find(self, dirs, current_dir):
+        path = self.convert_to_directories(self.path)
+        location = self.locate(dirs, current_dir)
+        
+        if len(path) == 1 or self.as_name:
+            as_name = self.as_name if self.as_name else path[0]
+            if location:
+                directory, name = location
+                return [(as_name, BasicTypeVariable([dirs[directory][name].get_module_type()]))]
+            # Can't find it
+            return [(as_name, BasicTypeVariable([Any_Type()]))]
         else:
             return [(path[0], BasicTypeVariable([Any_Type()]))]
                 
@@ -0,0 +1,92 @@
+''' The module import graph. Modules are keyed by their PyFile's
+    path_and_name, e.g. "pkg/sub/module". '''
+
+def file_tree_to_list(file_tree):
+    file_lists = []
+    name_dicts = file_tree.values()
+    for n_dict in name_dicts:
+        file_lists.extend(n_dict.values())
+    return file_lists
+
+def module_key(directory, name):
+    return directory + "/" + name
+
+def resolve_imports(file, file_tree):
+    ''' Returns the keys of the modules in file_tree that file imports. '''
+    imported = set()
+    for dependent in file.get_source().import_dependents:
+        for directory, name in dependent.resolve(file_tree, file.get_path()):
+            imported.add(module_key(directory, name))
+    return imported
+
+def build_import_graph(file_tree):
+    ''' Maps every module to the set of modules it imports. '''
+    return {file.path_and_name : resolve_imports(file, file_tree) for file in file_tree_to_list(file_tree)}
+
+def reverse_graph(graph):
+    ''' Maps every module to the set of modules which import it. '''
+    importers = {key : set() for key in graph}
+    for key, imported in graph.items():
+        for imported_key in imported:
+            importers.setdefault(imported_key, set()).add(key)
+    return importers
+
+def connected_modules(graph, modules):
+    ''' Returns modules together with everything joined to them by a chain
+        of imports, followed either way. '''
+    importers = reverse_graph(graph)
+    found = set(modules)
+    to_visit = list(modules)
+    while to_visit:
+        key = to_visit.pop()
+        for linked in graph.get(key, set()) | importers.get(key, set()):
+            if linked not in found:
+                found.add(linked)
+                to_visit.append(linked)
+    return found
+
+def strongly_connected_components(graph):
+    ''' Tarjan's algorithm, without recursion as import chains can be long.
+        Returns lists of module keys such that every component comes after
+        the components it imports, i.e. in reverse topological order. '''
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for start in graph:
+        if start in index:
+            continue
+        # Each frame is a module and an iterator over what it imports
+        frames = [(start, iter(sorted(graph[start])))]
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        while frames:
+            key, imported = frames[-1]
+            for imported_key in imported:
+                if imported_key not in graph:
+                    continue
+                if imported_key not in index:
+                    index[imported_key] = lowlink[imported_key] = len(index)
+                    stack.append(imported_key)
+                    on_stack.add(imported_key)
+                    frames.append((imported_key, iter(sorted(graph[imported_key]))))
+                    break
+                if imported_key in on_stack:
+                    lowlink[key] = min(lowlink[key], index[imported_key])
+            else:
+                frames.pop()
+                if frames:
+                    importer = frames[-1][0]
+                    lowlink[importer] = min(lowlink[importer], lowlink[key])
+                if lowlink[key] == index[key]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member == key:
+                            break
+                    components.append(component)
+    return components
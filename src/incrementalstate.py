@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from src.importgraph import build_import_graph, connected_modules, file_tree_to_list
+from src.treecache import analyzer_version
+from src.treepickler import dump_tree, load_tree
+
+class IncrementalState():
+    ''' Remembers between runs the content hash of every module, the modules
+        its imports resolved to and its typed tree along with its issues.
+
+        A module is re-typed if it changed, if its imports now resolve
+        differently or if it's joined to such a module by a chain of
+        imports, followed either way. Types flow both ways along an import,
+        e.g. the arguments an importer passes reach the imported function,
+        so nothing else can be affected and the result is the same as
+        typing every module. The imports of the last run count too, as a
+        module may hold types from an importer which no longer imports it
+        or has been deleted. Every other module is loaded as it was typed
+        last time. '''
+
+    INDEX_NAME = "index.pickle"
+
+    def __init__(self, directory, top_level):
+        self.directory = os.path.abspath(directory)
+        self.top_level = os.path.abspath(top_level)
+        self.modules_directory = os.path.join(self.directory, "modules")
+        os.makedirs(self.modules_directory, exist_ok=True)
+        # Module key -> (content hash, set of imported module keys)
+        self.index = self.load_index()
+        self.hashes = {}
+        self.graph = {}
+        self.reused = set()
+
+    def load_index(self):
+        try:
+            with open(os.path.join(self.directory, self.INDEX_NAME), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except (EOFError, pickle.UnpicklingError):
+            return {}
+
+    def content_hash(self, file):
+        digest = hashlib.sha256(analyzer_version().encode())
+        file_path = os.path.join(self.top_level, file.get_path(), file.get_name() + ".py")
+        with open(file_path, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def module_path(self, key):
+        return os.path.join(self.modules_directory, hashlib.sha256(key.encode()).hexdigest() + ".pickle")
+
+    def load_module(self, key):
+        try:
+            with open(self.module_path(key), 'rb') as f:
+                return load_tree(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def reuse_unchanged(self, file_tree, error_issuer):
+        ''' Swaps every module which does not need re-typing for its typed
+            tree from the last run and re-adds its issues. Returns the keys
+            of the reused modules. '''
+        self.graph = build_import_graph(file_tree)
+        files = {file.path_and_name : file for file in file_tree_to_list(file_tree)}
+        changed = set()
+        for key, file in files.items():
+            self.hashes[key] = self.content_hash(file)
+            if self.index.get(key) != (self.hashes[key], self.graph[key]):
+                changed.add(key)
+
+        # Deleted modules have changed as well
+        links = {key : set(imported) for key, imported in self.graph.items()}
+        for key, (_, imported) in self.index.items():
+            links.setdefault(key, set()).update(imported)
+            if key not in files:
+                changed.add(key)
+
+        loaded = {}
+        retype = connected_modules(links, changed)
+        for key in files:
+            if key in retype:
+                continue
+            typed = self.load_module(key)
+            if not typed:
+                # Lost the typed tree, so it and everything joined to it
+                # are re-typed
+                retype |= connected_modules(links, [key])
+                continue
+            loaded[key] = typed
+
+        for key, (typed_file, issues) in loaded.items():
+            if key in retype:
+                continue
+            file_tree[typed_file.get_path()][typed_file.get_name()] = typed_file
+            for issue in issues:
+                error_issuer.add_issue(issue)
+            self.reused.add(key)
+        return self.reused
+
+    def save(self, file_tree, error_issuer):
+        ''' Stores the typed trees of the modules typed in this run and the
+            new index. '''
+        issues = {}
+        for issue in error_issuer.issues:
+            issues.setdefault(issue.module_name, []).append(issue)
+
+        index = {}
+        for file in file_tree_to_list(file_tree):
+            key = file.path_and_name
+            if key not in self.reused:
+                self.store_atomically(self.module_path(key), (file, issues.get(key, [])), True)
+            index[key] = (self.hashes[key], self.graph[key])
+        # Forget modules which have been deleted
+        for key in self.index:
+            if key not in index and os.path.exists(self.module_path(key)):
+                os.remove(self.module_path(key))
+        self.store_atomically(os.path.join(self.directory, self.INDEX_NAME), index, False)
+        self.index = index
+
+    def store_atomically(self, path, value, typed_tree):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        replaced = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if typed_tree:
+                    dump_tree(value, f, drop_dependents = True)
+                else:
+                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            replaced = True
+        finally:
+            if not replaced:
+                os.remove(temp_path)
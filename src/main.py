@@ -1,12 +1,18 @@
 import src.extractpysfromdirectory as file_extractor
 from src.typechecking.typeinferrer import TypeInferrer
+from src.typechecking.sccscheduler import type_in_pool
+from src.typechecking.worklist import MAX_TYPES, MAX_TYPES_PER_CLASS, set_type_limits
 from src.typechecking.errorissuer import ErrorIssuer
 from src.stats import Statistics
+from src.incrementalstate import IncrementalState
+from src.importgraph import file_tree_to_list
 from src.traversers.printtypes import Print_Types
 from src.typechecking.basictypevariable import BasicTypeVariable
 from src.typechecking.argtypevariable import ArgTypeVariable
 from src.typeclasses import Int_Type, Float_Type, String_Type
 
+import argparse
+import logging
 import timeit
 import sys
 
@@ -27,9 +33,38 @@ if __name__ == '__main__':
    # arg_type.is_same_as_self(BasicTypeVariable(list(extracted)))
    # assert(False)
    
-    print(sys.argv)
-    assert len(sys.argv) == 2, "Enter only one directory."
-    top_level = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Infers the types in a directory of Python files.")
+    parser.add_argument("directory", help="The top level directory to type check.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes used to prepare the files.")
+    parser.add_argument("--parallel-typing", action="store_true",
+                        help="Also type independent groups of modules in the --jobs processes. "
+                             "Imported modules are then not affected by how their importers use them.")
+    parser.add_argument("--cache-dir",
+                        help="Directory in which to cache the prepared files between runs.")
+    parser.add_argument("--stats-json", metavar="FILE",
+                        help="Write the statistics, including per module and per phase timings, to FILE as JSON.")
+    parser.add_argument("--incremental", metavar="STATE_DIR",
+                        help="Only re-type changed modules and the modules joined to them by imports, "
+                             "keeping state in STATE_DIR.")
+    parser.add_argument("--max-types", type=int, default=MAX_TYPES, metavar="N",
+                        help="Widen a variable to Any once it holds more than N types. 0 for no limit.")
+    parser.add_argument("--max-types-per-class", type=int, default=MAX_TYPES_PER_CLASS, metavar="K",
+                        help="Widen a variable to Any once it holds more than K types of one class, "
+                             "e.g. K functions. 0 for no limit.")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="Log progress. Given twice also logs debugging output.")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Only log errors, not warnings about the files being checked.")
+    args = parser.parse_args()
+    if args.quiet:
+        log_level = logging.ERROR
+    else:
+        log_level = [logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)]
+    logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
+    logging.getLogger(__name__).debug("Arguments %s", sys.argv)
+    top_level = args.directory
+    set_type_limits(args.max_types or None, args.max_types_per_class or None)
 
     
     #top_level = "/homes/dr1810/4thYear/individualProject/demos/demo4"
@@ -37,13 +72,25 @@ if __name__ == '__main__':
     
     start = timeit.default_timer()
     
-    file_tree = file_extractor.get_pys(top_level)
+    state = IncrementalState(args.incremental, top_level) if args.incremental else None
+    file_tree = file_extractor.get_pys(top_level, args.jobs, args.cache_dir)
     issuer = ErrorIssuer()
     stats  = Statistics()
-    ti = TypeInferrer(issuer, stats)
-    ti.run(file_tree)
+    for file in file_tree_to_list(file_tree):
+        stats.add_file_phases(file)
+    if state:
+        state.reuse_unchanged(file_tree, issuer)
+    if args.parallel_typing and args.jobs > 1:
+        type_in_pool(file_tree, issuer, stats, args.jobs)
+    else:
+        ti = TypeInferrer(issuer, stats)
+        ti.run(file_tree)
+    if state:
+        state.save(file_tree, issuer)
     print("Statistics:")
     stats.print_stats() 
+    if args.stats_json:
+        stats.write_json(args.stats_json)
     print()
     print("Inferred Types:")
     type_printer = Print_Types()
@@ -0,0 +1,96 @@
+''' Checks typing in a pool of processes against typing in this one. Both
+    type the same directory from freshly prepared files, e.g.
+
+        python3 src/paralleltypingcheck.py some/project -j 4
+
+    The modules of one component don't change the types of the modules
+    they import when typed in a pool, so a variable may have fewer types
+    there. Every type a pooled variable has must also be found by the
+    sequential run though. Functions are told apart by their names, so this
+    also catches two functions being taken for one. '''
+
+import argparse
+import ast
+import logging
+import sys
+
+import src.extractpysfromdirectory as file_extractor
+from src.importgraph import file_tree_to_list
+from src.stats import Statistics
+from src.typeclasses import BUILTIN_TYPE_DICT, Def_Type
+from src.typechecking.errorissuer import ErrorIssuer
+from src.typechecking.sccscheduler import type_in_pool
+from src.typechecking.typeinferrer import TypeInferrer
+
+def type_kinds(var):
+    ''' The kinds of the types var holds. Unnamed functions are builtins,
+        whose kinds differ between processes. '''
+    kinds = set()
+    for var_type in var.get():
+        if isinstance(var_type, Def_Type) and var_type.name is None:
+            kinds.add("Def(builtin)")
+        else:
+            kinds.add(var_type.kind)
+    return kinds
+
+def inferred_types(file_tree):
+    ''' Maps (module, scope, variable name) to the kinds of the variable's
+        types for every variable of every scope in file_tree. The variables
+        a scope shares with its parent are only counted in the parent. '''
+    inferred = {}
+    for file in file_tree_to_list(file_tree):
+        root = file.get_source()
+        for name, var in root.variableTypes.items():
+            if name not in BUILTIN_TYPE_DICT:
+                inferred[(file.path_and_name, "", name)] = type_kinds(var)
+        for node in ast.walk(root):
+            if not isinstance(node, (ast.FunctionDef, ast.ClassDef)) or not hasattr(node, "variableTypes"):
+                continue
+            scope = "%s@%d" % (node.name, node.lineno)
+            parent_vars = node.stc_context.variableTypes
+            for name, var in node.variableTypes.items():
+                if parent_vars.get(name) is not var:
+                    inferred[(file.path_and_name, scope, name)] = type_kinds(var)
+    return inferred
+
+def type_directory(directory, jobs):
+    ''' Prepares and types directory, in a pool of jobs processes if jobs is
+        more than one. '''
+    file_tree = file_extractor.get_pys(directory)
+    if jobs > 1:
+        type_in_pool(file_tree, ErrorIssuer(), Statistics(), jobs)
+    else:
+        TypeInferrer(ErrorIssuer(), Statistics()).run(file_tree)
+    return inferred_types(file_tree)
+
+def compare(sequential, pooled):
+    ''' Returns the differences which typing in a pool can't explain, each
+        as a line to report, and the number of variables with fewer types. '''
+    problems = []
+    fewer = 0
+    for key in sorted(set(sequential) | set(pooled)):
+        if key not in sequential or key not in pooled:
+            problems.append("%s %s %s: only typed %s" % (key + ("sequentially" if key in sequential else "in the pool",)))
+            continue
+        extra = pooled[key] - sequential[key]
+        if extra:
+            problems.append("%s %s %s: only the pool found %s" % (key + (sorted(extra),)))
+        elif pooled[key] != sequential[key]:
+            fewer += 1
+    return problems, fewer
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Checks typing in a pool of processes against typing sequentially.")
+    parser.add_argument("directory", help="The top level directory of the Python files to type.")
+    parser.add_argument("-j", "--jobs", type=int, default=2,
+                        help="Number of processes to type in, at least 2.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    sequential = type_directory(args.directory, 1)
+    pooled = type_directory(args.directory, max(args.jobs, 2))
+    problems, fewer = compare(sequential, pooled)
+    for problem in problems:
+        print(problem)
+    print("%d variables, %d with fewer types in the pool, %d problems" % (len(sequential), fewer, len(problems)))
+    sys.exit(1 if problems else 0)
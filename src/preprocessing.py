@@ -1,5 +1,6 @@
 import ast
 import copy
+import logging
 from pprint import pprint
 
 from src.typeclasses import BUILTIN_TYPE_DICT
@@ -7,6 +8,8 @@ from src.utils import Utils
 from src.traversers.astfulltraverser import AstFullTraverser
 from src.importdependent import ImportDependent, Import, ImportFrom
 
+log = logging.getLogger(__name__)
+
 class Preprocessor(AstFullTraverser):
     '''
     '''
@@ -37,15 +40,13 @@ class Preprocessor(AstFullTraverser):
         
     def visit(self,node):
         '''Inject node references in all nodes.'''
-        assert isinstance(node,ast.AST),node.__class__.__name__
         # Save the previous context & parent & inject references.
         # Injecting these two references is cheap.
         node.stc_context = self.context
         node.stc_parent = self.parent
         # Visit the children with the new parent.
         self.parent = node
-        method = getattr(self,'do_' + node.__class__.__name__)
-        result = method(node)
+        result = self.dispatch_table[node.__class__](self,node)
         # Restore the context & parent.
         self.context = node.stc_context
         self.parent = node.stc_parent
@@ -60,7 +61,7 @@ class Preprocessor(AstFullTraverser):
             if parent_class:
                 parent_class.self_variables.add(node.attr)
             else:
-                print("Error: self outside of class. ")
+                log.warning("Line %s self outside of class", node.lineno)
 
             
     def find_parent_class_def(self, node):
@@ -5,10 +5,11 @@ from src.traversers.astfulltraverser import AstFullTraverser
 from src.importdependent import ImportDependent
 from src.typechecking.basictypevariable import BasicTypeVariable
 from src.typechecking.argtypevariable import ArgTypeVariable
+from src.typechecking.scope import Scope
 from src.typeclasses import *
-from src.traversers.ssatraverser import Phi_Node
+from src.traversers.ssatraverser import Phi_Node, Phi_Visiting
 
-class PreprocessorSecond(AstFullTraverser):
+class PreprocessorSecond(Phi_Visiting, AstFullTraverser):
     '''
     Creates a BasicTypeVariable for every variable in the correct scope.
     '''
@@ -21,15 +22,6 @@ class PreprocessorSecond(AstFullTraverser):
         self.visit(root)
         return root
         
-    def visit(self,node):
-        if hasattr(node, "phi_nodes"):
-            phis = node.phi_nodes
-            for phi in phis:
-                self.visit(phi)
-        method = getattr(self,'do_' + node.__class__.__name__)
-        result = method(node)
-        return result
-    
     def do_Phi_Node(self, node):
         if node.get_var() not in self.variableTypes:
             self.variableTypes[node.var] = BasicTypeVariable()
@@ -40,8 +32,7 @@ class PreprocessorSecond(AstFullTraverser):
             self.variableTypes[node.name] = BasicTypeVariable()  
             
         old_types = self.variableTypes 
-        node.variableTypes = {}
-        node.variableTypes.update(self.variableTypes)
+        node.variableTypes = Scope(self.variableTypes)
         self.variableTypes = node.variableTypes
         self.variableTypes.update({name : BasicTypeVariable() for name in node.global_variables if name not in self.variableTypes})
         self.variableTypes.update({name : BasicTypeVariable() for name in node.self_variables if name not in self.variableTypes})
@@ -49,8 +40,7 @@ class PreprocessorSecond(AstFullTraverser):
         try:
             for z in node.bases:
                 self.visit(z)
-            for z in node.body:
-                self.visit(z)
+            self.visit_statements(node.body)
             for z in node.decorator_list:
                 self.visit(z)
         finally:
@@ -77,13 +67,11 @@ class PreprocessorSecond(AstFullTraverser):
             self.variableTypes[node.name] = BasicTypeVariable()
             
         old_types = self.variableTypes 
-        node.variableTypes = {}
-        node.variableTypes.update(self.variableTypes)
+        node.variableTypes = Scope(self.variableTypes)
         self.variableTypes = node.variableTypes
         try:
             self.visit(node.args)
-            for z in node.body:
-                self.visit(z)
+            self.visit_function_body(node)
             for z in node.decorator_list:
                 self.visit(z)
         finally:
@@ -97,11 +85,12 @@ class PreprocessorSecond(AstFullTraverser):
         self.visit(node.body)
 
     def do_Module (self,node):
-        node.variableTypes = {}
+        # The builtins are read through the scope rather than copied in
+        node.variableTypes = Scope()
         self.variableTypes = node.variableTypes
-        # Add the builtin_types to the variable dict
-        self.variableTypes.update(BUILTIN_TYPE_DICT)
-        self.variableTypes.update({name : BasicTypeVariable() for name in node.global_variables if name not in self.variableTypes})
+        # The global variables include the builtins, which are left to the scope
+        self.variableTypes.update({name : BasicTypeVariable() for name in node.global_variables
+                                   if name not in self.variableTypes and name not in BUILTIN_TYPE_DICT})
         
         # Add names for imports
         for dependent in node.import_dependents:
@@ -109,8 +98,7 @@ class PreprocessorSecond(AstFullTraverser):
             # Don't include wildcard
             if as_name not in self.variableTypes and as_name != "*":
                 self.variableTypes[as_name] = BasicTypeVariable() 
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
      #   print("Module vars")
      #   pprint(node.variableTypes)
         module_type = Module_Type(node.variableTypes)
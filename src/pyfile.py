@@ -1,20 +1,32 @@
 import ast
+import logging
 
 from src.preprocessing import Preprocessor
 from src.controlflowgraph import ControlFlowGraph, PrintCFG
 from src.traversers.ssatraverser import SSA_Traverser
-from src.traversers.ssapreprocessor import SSA_Pre_Processor
+from src.traversers.ssapreprocessor import SSA_Pre_Processor, Fused_Preprocessor
 from src.preprocessingsecond import PreprocessorSecond
 from src.utils import Utils
+from src.stats import Phase_Timer
 import src.stcglobals as stcglobals
 
+log = logging.getLogger(__name__)
+
 class PyFile(object):
 
-    def __init__(self, name, relative_path, root):  
+    def __init__(self, name, relative_path, root, cache = None, fused = True):  
         # The base type for this file. All files have a module type.
         self.module_type = None
         self.path_and_name = relative_path + "/" + name
-        self.source = self.prepare_file(root)
+        # Phase -> timings, see Statistics
+        self.phase_timings = {}
+        # Whether the SSA preprocessing is done in the same walk as the
+        # preprocessing rather than as a pass of its own
+        self.fused = fused
+        if cache:
+            self.source = self.prepare_file_cached(root, cache)
+        else:
+            self.source = self.prepare_file(root)
         self.relative_path = relative_path
         self.name = name
         self.typed = False
@@ -24,36 +36,61 @@ class PyFile(object):
         utils = Utils()
         
         ''' Applies cfg, ssa and preprocessing. '''
-        print("ast-ing " + self.path_and_name)
+        log.info("Preparing %s", self.path_and_name)
+        timer = Phase_Timer()
         ast_source = PyFile.parse_file(root)
-        print("Finished ast " + self.path_and_name)
+        self.finish_phase("parse", timer)
         
     #    print(utils.dump_ast(ast_source))
         
-        print("preprocessing " + self.path_and_name)
-        pp_source = PyFile.apply_preprocessing(root, ast_source)
-        print("Finished preprocessing " + self.path_and_name)
+        timer = Phase_Timer()
+        if self.fused:
+            pp_source = PyFile.apply_fused_preprocessing(root, ast_source)
+        else:
+            pp_source = PyFile.apply_preprocessing(root, ast_source)
+        self.finish_phase("preprocessing", timer)
         
-        print("Generating CFG for: " + self.path_and_name)
+        timer = Phase_Timer()
         cfg_source = self.apply_cfg(pp_source)
+        self.finish_phase("cfg", timer)
      #   PrintCFG(cfg_source)
-        print("Finished CFG for: " + self.path_and_name)
         
-        print("ssa preprocessing " + self.path_and_name)
-        ssa_pp_source = PyFile.apply_ssa_preprocessing(cfg_source)
-        print("Finished ssa preprocessing " + self.path_and_name)
+        if self.fused:
+            ssa_pp_source = cfg_source
+        else:
+            timer = Phase_Timer()
+            ssa_pp_source = PyFile.apply_ssa_preprocessing(cfg_source)
+            self.finish_phase("ssa_preprocessing", timer)
 
-        print("ssa-ing " + self.path_and_name)
+        timer = Phase_Timer()
         ssa_source = PyFile.apply_ssa(ssa_pp_source)
-        print("Finished ssa-ing " + self.path_and_name)
+        self.finish_phase("ssa", timer)
         
-        print("preprocessingsecond " + self.path_and_name)
+        timer = Phase_Timer()
         pp_2_source = PyFile.apply_preprocessing_second(self, ssa_source)
-        print("Finished preprocessingsecond " + self.path_and_name)
+        self.finish_phase("preprocessing_second", timer)
         
    #     print(utils.dump_ast(pp_2_source))
         
         return pp_2_source
+    
+    def finish_phase(self, phase, timer):
+        self.phase_timings[phase] = timer.stop()
+        log.debug("Finished %s for %s in %.3fs", phase, self.path_and_name, self.phase_timings[phase]['wall'])
+    
+    def prepare_file_cached(self, root, cache):
+        ''' Loads the prepared tree from the cache if the file is unchanged,
+            otherwise prepares it and stores the result. '''
+        timer = Phase_Timer()
+        key = cache.key_for(root)
+        cached = cache.load(key)
+        if cached:
+            source, self.module_type = cached
+            self.finish_phase("cache_load", timer)
+            return source
+        source = self.prepare_file(root)
+        cache.store(key, (source, self.module_type))
+        return source
         
     def get_source(self):
         return self.source
@@ -102,6 +139,11 @@ class PyFile(object):
         pp = Preprocessor()
         return pp.run(root, source)
     
+    @staticmethod
+    def apply_fused_preprocessing(root, source):
+        pp = Fused_Preprocessor()
+        return pp.run(root, source)
+    
     @staticmethod
     def apply_cfg(source):
         cfg = ControlFlowGraph()
@@ -1,3 +1,38 @@
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is then not recorded
+    resource = None
+
+def process_peak_memory():
+    ''' The peak resident memory of the whole process so far in kilobytes, or
+        None if it can't be found. It never goes down, so it isn't the memory
+        used by any one phase. '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # In bytes on OS X, kilobytes elsewhere
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+class Phase_Timer():
+    ''' Times a phase from when it's made until stop is called. '''
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        
+    def stop(self):
+        ''' Returns the wall and CPU time in seconds and the peak memory of the
+            process by the end of the phase. '''
+        return {'wall' : time.perf_counter() - self.wall,
+                'cpu' : time.process_time() - self.cpu,
+                'process_peak_memory_kb' : process_peak_memory()}
+
 class Statistics():
     def __init__(self):
         self.num_modules = 0
@@ -5,6 +40,10 @@ class Statistics():
         self.num_funcs = 0
         self.num_func_calls = 0
         self.num_binops = 0
+        # Module -> phase -> timings from Phase_Timer.stop
+        self.module_phases = {}
+        # Module -> solver counts while typing it
+        self.module_solver = {}
         
     def inc_num_modules(self):
         self.num_modules += 1
@@ -21,9 +60,84 @@ class Statistics():
     def inc_num_binops(self):
         self.num_binops += 1 
         
+    def add_phase(self, module_name, phase, timings):
+        self.module_phases.setdefault(module_name, {})[phase] = timings
+        
+    def add_file_phases(self, file):
+        ''' Adds the front end timings recorded by a PyFile. '''
+        for phase, timings in file.phase_timings.items():
+            self.add_phase(file.path_and_name, phase, timings)
+        
+    def add_solver_counts(self, module_name, propagations, receive_updates, largest_type_set, collapsed = 0,
+                          widenings = 0):
+        self.module_solver[module_name] = {'propagations' : propagations,
+                                           'receive_updates' : receive_updates,
+                                           'largest_type_set' : largest_type_set,
+                                           'collapsed_variables' : collapsed,
+                                           'widenings' : widenings}
+        
+    def add(self, other):
+        ''' Adds the counts gathered by another Statistics, e.g. one from a
+            worker process. '''
+        self.num_modules += other.num_modules
+        self.num_classes += other.num_classes
+        self.num_funcs += other.num_funcs
+        self.num_func_calls += other.num_func_calls
+        self.num_binops += other.num_binops
+        for module_name, phases in other.module_phases.items():
+            self.module_phases.setdefault(module_name, {}).update(phases)
+        self.module_solver.update(other.module_solver)
+        
+    def phase_totals(self):
+        ''' Phase -> timings summed over the modules. The peak memory is the
+            highest process peak seen at the end of the phase. '''
+        totals = {}
+        for phases in self.module_phases.values():
+            for phase, timings in phases.items():
+                total = totals.setdefault(phase, {'wall' : 0.0, 'cpu' : 0.0, 'process_peak_memory_kb' : None})
+                total['wall'] += timings['wall']
+                total['cpu'] += timings['cpu']
+                if timings['process_peak_memory_kb'] is not None:
+                    total['process_peak_memory_kb'] = max(total['process_peak_memory_kb'] or 0,
+                                                          timings['process_peak_memory_kb'])
+        return totals
+    
+    def solver_totals(self):
+        counts = self.module_solver.values()
+        return {'propagations' : sum(count['propagations'] for count in counts),
+                'receive_updates' : sum(count['receive_updates'] for count in counts),
+                'largest_type_set' : max([count['largest_type_set'] for count in counts] or [0]),
+                'collapsed_variables' : sum(count['collapsed_variables'] for count in counts),
+                'widenings' : sum(count['widenings'] for count in counts)}
+        
+    def as_dict(self):
+        return {'counts' : {'modules' : self.num_modules,
+                            'classes' : self.num_classes,
+                            'functions' : self.num_funcs,
+                            'function_calls' : self.num_func_calls,
+                            'binops' : self.num_binops},
+                'phases' : self.phase_totals(),
+                'solver' : self.solver_totals(),
+                'modules' : {module_name : {'phases' : self.module_phases.get(module_name, {}),
+                                            'solver' : self.module_solver.get(module_name)}
+                             for module_name in sorted(set(self.module_phases) | set(self.module_solver))}}
+        
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent = 2, sort_keys = True)
+        
     def print_stats(self):
         print("Number of modules: " + str(self.num_modules))
         print("Number of classes: " + str(self.num_classes))
         print("Number of functions: " + str(self.num_funcs))
         print("Number of function calls: " + str(self.num_func_calls))
-        print("Number of binops: " + str(self.num_binops))
\ No newline at end of file
+        print("Number of binops: " + str(self.num_binops))
+        solver = self.solver_totals()
+        print("Number of propagations: " + str(solver['propagations']))
+        print("Number of receive_update calls: " + str(solver['receive_updates']))
+        print("Largest type set: " + str(solver['largest_type_set']))
+        print("Variables merged in cycles: " + str(solver['collapsed_variables']))
+        print("Type sets widened to Any: " + str(solver['widenings']))
+        for phase, timings in sorted(self.phase_totals().items()):
+            print("Phase " + phase + ": wall " + "%.2fs" % timings['wall'] + ", cpu " + "%.2fs" % timings['cpu'] +
+                  ", process peak memory by its end " + str(timings['process_peak_memory_kb']) + " KB")
@@ -1,4 +1,31 @@
-class AstBaseTraverser:
+class Dispatch_Table(dict):
+    ''' Maps the classes of the nodes a traverser class visits to its visitor
+        for each, the do_ method named after the node class. A visitor is
+        looked up the first time its node class is met, falling back to the
+        traverser's default_visitor if it has one. '''
+
+    def __init__(self, traverser_class):
+        super().__init__()
+        self.traverser_class = traverser_class
+
+    def __missing__(self, node_class):
+        name = 'do_' + node_class.__name__
+        if hasattr(self.traverser_class, 'default_visitor'):
+            visitor = getattr(self.traverser_class, name, self.traverser_class.default_visitor)
+        else:
+            visitor = getattr(self.traverser_class, name)
+        self[node_class] = visitor
+        return visitor
+
+class Dispatching(type):
+    ''' Gives every traverser class a dispatch_table of its own, since a
+        subclass may override any visitor. '''
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls.dispatch_table = Dispatch_Table(cls)
+
+class AstBaseTraverser(metaclass=Dispatching):
     '''The base class for all other traversers.'''
 
     def __init__(self):
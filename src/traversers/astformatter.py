@@ -26,10 +26,7 @@ class AstFormatter(AstFullTraverser):
         elif node is None:
             return 'None'
         else:
-            assert isinstance(node,ast.AST),node.__class__.__name__
-            method_name = 'do_' + node.__class__.__name__
-            method = getattr(self,method_name)
-            s = method(node)
+            s = self.dispatch_table[node.__class__](self,node)
             assert type(s)==type('abc'),type(s)
             return s
     #@+node:ekr.20120626085227.11490: *4* f.format
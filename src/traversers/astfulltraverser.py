@@ -200,8 +200,7 @@ class AstFullTraverser(AstBaseTraverser):
     def do_ClassDef (self,node):
         for z in node.bases:
             self.visit(z)
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
         for z in node.decorator_list:
             self.visit(z)
             
@@ -217,8 +216,7 @@ class AstFullTraverser(AstBaseTraverser):
             self.visit(node.type)
         if node.name and isinstance(node.name,ast.Name):
             self.visit(node.name)
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
 
     def do_Exec(self,node):
         self.visit(node.body)
@@ -230,15 +228,12 @@ class AstFullTraverser(AstBaseTraverser):
     def do_For (self,node):
         self.visit(node.target)
         self.visit(node.iter)
-        for z in node.body:
-            self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
+        self.visit_statements(node.body)
+        self.visit_statements(node.orelse)
 
     def do_FunctionDef (self,node):
         self.visit(node.args)
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
         for z in node.decorator_list:
             self.visit(z)
 
@@ -247,10 +242,8 @@ class AstFullTraverser(AstBaseTraverser):
 
     def do_If(self,node):
         self.visit(node.test)
-        for z in node.body:
-            self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
+        self.visit_statements(node.body)
+        self.visit_statements(node.orelse)
 
     def do_Import(self,node):
         pass
@@ -266,8 +259,7 @@ class AstFullTraverser(AstBaseTraverser):
         self.visit(node.body)
 
     def do_Module (self,node):
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
 
     def do_Pass(self,node):
         pass
@@ -291,41 +283,31 @@ class AstFullTraverser(AstBaseTraverser):
             self.visit(node.value)
 
     def do_Try(self, node):
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
         for z in node.handlers:
             self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
-        for z in node.finalbody:
-            self.visit(z)
+        self.visit_statements(node.orelse)
+        self.visit_statements(node.finalbody)
 
     def do_TryExcept(self, node):
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
         for z in node.handlers:
             self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
+        self.visit_statements(node.orelse)
 
     def do_TryFinally(self, node):
-        for z in node.body:
-            self.visit(z)
-        for z in node.finalbody:
-            self.visit(z)
+        self.visit_statements(node.body)
+        self.visit_statements(node.finalbody)
 
     def do_While (self, node):
         self.visit(node.test)
-        for z in node.body:
-            self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
+        self.visit_statements(node.body)
+        self.visit_statements(node.orelse)
             
     def do_With(self, node):
         for z in node.items:
             self.visit(z)
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
             
     def do_withitem(self, node):
         self.visit(node.context_expr)
@@ -336,9 +318,11 @@ class AstFullTraverser(AstBaseTraverser):
         if node.value:
             self.visit(node.value)
 
+    def visit_statements(self, statements):
+        ''' Visits a list of statements, e.g. a body. '''
+        for z in statements:
+            self.visit(z)
+
     def visit(self,node):
         '''Visit a *single* ast node.  Visitors are responsible for visiting children!'''
-        assert isinstance(node,ast.AST),node.__class__.__name__
-        method_name = 'do_' + node.__class__.__name__
-        method = getattr(self,method_name)
-        return method(node)
\ No newline at end of file
+        return self.dispatch_table[node.__class__](self,node)
\ No newline at end of file
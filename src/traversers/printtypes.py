@@ -23,11 +23,6 @@ class Print_Types(AstFullTraverser):
         self.module_name = file.get_path() + "/" + file.get_name()
         self.visit(root)
     
-    def visit(self, node):
-        '''Visit a single node.  Callers are responsible for visiting children.'''
-        method = getattr(self,'do_' + node.__class__.__name__)
-        return method(node)
-    
     def print_all(self, to_print):
         for name, type_set in to_print.items():
             print(name + ": " + str(type_set))
@@ -1,6 +1,7 @@
 from pprint import pprint
 import ast
 
+from src.preprocessing import Preprocessor
 from src.traversers.astfulltraverser import AstFullTraverser
 from src.typeclasses import *
 
@@ -21,17 +22,12 @@ class SSA_Pre_Processor(AstFullTraverser):
         self.visit(source)
         return source
         
-    def visit(self, node):
-        '''Visit a single node. Callers are responsible for visiting children.'''
-        method = getattr(self, 'do_' + node.__class__.__name__)
-        return method(node)
-    
     def do_Module(self, node):
         self.global_variables = node.global_variables
         for dependent in node.import_dependents:
             self.ssa_exempts.add(dependent.get_as_name())
             
- #       self.process_blocks(node.initial_block)
+ #       self.process_blocks(node.cfg)
         for z in node.body:
             self.visit(z)
             
@@ -64,10 +60,16 @@ class SSA_Pre_Processor(AstFullTraverser):
         
         self.ssa_exempts.add(node.name)
         old_ssa_exempts = self.ssa_exempts.copy()
+        self.ssa_exempts |= nested_definitions(node)
         try:
             # Visit args to exempts them
             self.visit(node.args)
-            self.process_blocks(node.initial_block)
+            self.process_blocks(node.cfg)
+            # Functions and classes are left out of the blocks, and only
+            # those in compound statements are reached through them
+            for z in node.body:
+                if isinstance(z, (ast.FunctionDef, ast.ClassDef)):
+                    self.visit(z)
         finally:
             self.local_variables -= node.global_var_edits
            # print("Local variables for " + node.name)
@@ -138,57 +140,132 @@ class SSA_Pre_Processor(AstFullTraverser):
             self.visit(z)
             
     def do_Global(self, node):
-        assert isinstance(node.stc_context, ast.FunctionDef), "Global can't be outside of function"
-        for identifier in node.names:
-            assert isinstance(identifier, str)
-            node.stc_context.global_var_edits.add(identifier)
+        note_global(node)
         
     def do_Name(self, node):
-        # Global variable
-   #     if node.id == "bytes_":
-   #         pass
-        if isinstance(node.ctx, ast.Store) and (isinstance(node.stc_context, ast.Module) or isinstance(node.stc_context, ast.ClassDef)):
-            self.ssa_exempts.add(node.id)
-        if isinstance(node.stc_context, ast.Module):
-            return
-        if isinstance(node.stc_context, ast.ClassDef):
-            return
-        if node.id == "self" or node.id == "cls":
-            return
-        # Calculate local variables
-        if isinstance(node.ctx, ast.Store) and isinstance(node.stc_context, ast.FunctionDef) and node.id not in self.ssa_exempts:
-            self.local_variables.add(node.id)
-            
-        if node.id in self.ssa_exempts and isinstance(node.ctx, ast.Store):
-            self.global_phis.add(node.id)      
-            self.func_global_stores.add(node.id)     
-            
-        if node.id in BUILTIN_TYPE_DICT:
-            return
+        note_name(node, self.ssa_exempts, self.local_variables, self.func_global_stores)
         
-  #      self.current_block.referenced_vars.add(node.id)
+    def process_blocks(self, cfg):
+        ''' Every block of the graph can be reached from its entry, so the
+            statements are visited in the order of the blocks. '''
+        for block in range(len(cfg)):
+            if block == cfg.exit:
+                continue
+            self.current_block = block
+            for statement in cfg.block_statements(block):
+                self.visit(statement)
+
+def nested_definitions(node):
+    ''' The names of the functions and classes defined in the function node,
+        but not in those. They are exempt throughout the function whichever
+        order its statements are visited in. '''
+    names = set()
+    to_visit = list(node.body)
+    while to_visit:
+        statement = to_visit.pop()
+        if isinstance(statement, (ast.FunctionDef, ast.ClassDef)):
+            names.add(statement.name)
+            continue
+        to_visit.extend(child for child in ast.iter_child_nodes(statement)
+                        if isinstance(child, (ast.stmt, ast.excepthandler)))
+    return names
+
+def note_global(node):
+    ''' Notes the names a Global node says its function edits. '''
+    assert isinstance(node.stc_context, ast.FunctionDef), "Global can't be outside of function"
+    for identifier in node.names:
+        assert isinstance(identifier, str)
+        node.stc_context.global_var_edits.add(identifier)
+
+def note_name(node, ssa_exempts, local_variables, func_global_stores):
+    ''' Notes a store to a Name node as either being to a local variable
+        or to one of ssa_exempts. Names stored to outside of a function are
+        exempt from then on. '''
+    # Global variable
+    if isinstance(node.ctx, ast.Store) and (isinstance(node.stc_context, ast.Module) or isinstance(node.stc_context, ast.ClassDef)):
+        ssa_exempts.add(node.id)
+    if isinstance(node.stc_context, ast.Module):
+        return
+    if isinstance(node.stc_context, ast.ClassDef):
+        return
+    if node.id == "self" or node.id == "cls":
+        return
+    # Calculate local variables
+    if isinstance(node.ctx, ast.Store) and isinstance(node.stc_context, ast.FunctionDef) and node.id not in ssa_exempts:
+        local_variables.add(node.id)
         
+    if node.id in ssa_exempts and isinstance(node.ctx, ast.Store):
+        func_global_stores.add(node.id)     
+
+class Fused_Preprocessor(Preprocessor):
+    ''' A Preprocessor which also does the work of SSA_Pre_Processor in the
+        same walk, so that one doesn't need to be run.
+
+        The walk is in the order of the source rather than of the blocks.
+        That only matters for the imports, as all of a module's imports are
+        exempt from the start, and the functions and classes defined in a
+        function are exempt from its start in both. Stores to an import made
+        before the import are put right once the module is done. '''
+
+    def run(self, fn, root):
+        self.ssa_exempts = set()
+        self.local_variables = None
+        self.func_global_stores = None
+        # The functions seen, to put right once the imports are known
+        self.ssa_functions = []
+        return super().run(fn, root)
+
+    def do_Module(self, node):
+        super().do_Module(node)
+        imported = {dependent.get_as_name() for dependent in node.import_dependents}
+        for function in self.ssa_functions:
+            imported_stores = function.local_variables & imported
+            function.local_variables -= imported_stores | function.global_var_edits
+            function.func_global_stores |= imported_stores
+
+    def do_ClassDef(self, node):
+        self.ssa_exempts.add(node.name)
+        old_ssa_exempts = self.ssa_exempts.copy()
+        try:
+            super().do_ClassDef(node)
+        finally:
+            self.ssa_exempts = old_ssa_exempts
+
+    def do_FunctionDef(self, node):
+        node.global_var_edits = set()
+        old_locals = self.local_variables
+        node.local_variables = set()
+        self.local_variables = node.local_variables
+        old_func_store = self.func_global_stores
+        node.func_global_stores = set()
+        self.func_global_stores = node.func_global_stores
         
-    def process_blocks(self, block):
-        if block.ssa_prepro_mark:
-            return
-        if block.start_line_no == "Exit":
-            return
-        self.current_block = block
-        block.global_phis = set()
-        self.global_phis = block.global_phis
-#       pred_nos = [block.start_line_no for block in block.predecessors]
-#        exit_nos = [block.start_line_no for block in block.exit_blocks]
-   #     pprint("Block starting at: " + str(block.start_line_no) + " to " + str(exit_nos))
-   #     pprint("Block starting at: " + str(block.start_line_no) + " preceded by " + str(pred_nos))
-   #     print(block.statements)
-    #    if block.start_line_no == 4:
-    #        pass
-        for statement in block.statements:
-            self.visit(statement)
-            block.ssa_prepro_mark = True
-   #     print("Variables referenced: " + str(block.referenced_vars))
-        for an_exit in block.exit_blocks:
-            self.process_blocks(an_exit)
-      #  if block.next_block:
-      #      self.process_blocks(block.next_block)
\ No newline at end of file
+        self.ssa_exempts.add(node.name)
+        old_ssa_exempts = self.ssa_exempts.copy()
+        self.ssa_exempts |= nested_definitions(node)
+        try:
+            super().do_FunctionDef(node)
+        finally:
+            self.ssa_functions.append(node)
+            self.local_variables = old_locals
+            self.func_global_stores = old_func_store
+            self.ssa_exempts = old_ssa_exempts 
+
+    def do_arguments(self, node):
+        super().do_arguments(node)
+        if node.vararg:
+            self.ssa_exempts.add(node.vararg)
+        if node.kwarg:
+            self.ssa_exempts.add(node.kwarg)
+
+    def do_arg(self, node):
+        self.ssa_exempts.add(node.arg)
+        super().do_arg(node)
+
+    def do_Global(self, node):
+        super().do_Global(node)
+        note_global(node)
+
+    def do_Name(self, node):
+        note_name(node, self.ssa_exempts, self.local_variables, self.func_global_stores)
+        return super().do_Name(node)
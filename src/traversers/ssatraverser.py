@@ -1,16 +1,25 @@
+from src.dominators import (reverse_postorder, immediate_dominators, dominance_frontiers,
+                            dominator_tree, iterated_frontier)
 from src.traversers.astfulltraverser import AstFullTraverser
 from src.typeclasses import *
 from src.utils import Utils
 import ast
 import copy
+import logging
 from pprint import pprint
 
+log = logging.getLogger(__name__)
+
 class SSA_Traverser(AstFullTraverser):
     ''' The SSA_Traverser class traverses the AST tree.
     
     Definitions of a symbol N kill previous definitions of N.
     
-    Block processing is prioritised by ascending line numbers of the blocks.
+    Each function's blocks are renamed in order of its dominator tree, a
+    block starting with the names its immediate dominator ends with. Phi
+    nodes are only placed where the definitions of a variable meet, i.e. in
+    the iterated dominance frontier of the blocks defining it, and only
+    where the variable is live.
     '''
     def __init__(self):
         AstFullTraverser.__init__(self)
@@ -21,134 +30,158 @@ class SSA_Traverser(AstFullTraverser):
         self.local_variables = None
         self.function_ssa_tracker = {}
         self.func_global_stores = None
-       # self.block_tracker = {}
         self.in_function = False
-            # Keys are names, values are lists of a.values
-            # where a is an assignment. 
-        self.breaks = []
-        self.continues = []
-        self.blocks_to_process = []  # Block queue
+        # The names being SSA-ed in the current function
+        self.ssa_names = None
+        # Name -> number of the current version in the block being renamed.
+        # None is the unlabelled name.
+        self.tracker = None
+        # (loaded, stored) while noting the names a block uses
+        self.collecting = None
         assert isinstance(root, ast.Module)
         self.visit(root)
         return root
-    
-    def process_block_list(self):
-        while self.blocks_to_process:
-            block, dict_to_pass = self.blocks_to_process.pop(0)
-            self.process_block(block)
-            if dict_to_pass:
-                self.update_phis(block, dict_to_pass)
-        
-    def process_block(self, block):
-        ''' TODO: Handle infinite loops '''
-        if not self.in_function:
-            return
-        if block.ssa_mark:
-            return
-        block.ssa_mark = True
-        if block.start_line_no == "Exit":
-            return
-        if not block.statements:
-            return
-        
-    #    if block.start_line_no == 21:
-    #        pass
-        
-        self.current_block = block
-        # Update all but those created by phis
-        self.current_block.tracker.update({k:v for k,v in self.function_ssa_tracker.items() if k not in self.current_block.tracker and k not in self.func_global_stores})
-        for statement in block.statements:
-            self.visit(statement)
-        dict_to_pass = self.current_block.tracker.copy()
-        
-        print("Block " + str(block.start_line_no) + " to")
-        print(block.exit_blocks)        
-     #   print(block.statements)
-        
-        for an_exit in block.exit_blocks:
-            self.add_to_list((an_exit, dict_to_pass))
-            
-    def add_to_list(self, item):
-        if item[0].start_line_no == "Exit":
-            return
-        if not self.blocks_to_process:
-            self.blocks_to_process.append(item)
-            return
-        insert_num = item[0].start_line_no
-        i = 0
-        test_num = self.blocks_to_process[i][0].start_line_no
-        while insert_num > test_num and i < len(self.blocks_to_process) - 1:
-            i += 1
-            test_num = self.blocks_to_process[i][0].start_line_no
-        self.blocks_to_process.insert(i, item)
-        
-    def add_all_phi_nodes(self, block, local_variables):
-        if block.start_line_no == "Exit":
-            return
-        if not block.statements:
-            return
-        if block.has_phi_nodes:
-            return
-        global_phis = self.add_phi_nodes(block, local_variables)
-        for an_exit in block.exit_blocks:
-            self.add_all_phi_nodes(an_exit, local_variables | global_phis)
-            
-    def add_phi_nodes(self, block, local_variables):
-        ''' Only add phi nodes with blocks with more than entry point. '''
-        block.phi_nodes = {}
-        block.tracker = {}
-        block.statements[0].phi_nodes = []
-        global_phis = block.global_phis - self.global_var_edits
-        for ref_var in local_variables - global_phis:
-            new_phi = self.create_new_phi_node(ref_var, block)
-            block.phi_nodes[ref_var] = new_phi
-            block.statements[0].phi_nodes.append(new_phi)
-    #        print("Phi created for block " + str(block.start_line_no))
-    #        print(block.phi_nodes)
-        for ref_var in global_phis:
-            new_phi = self.create_new_phi_node(ref_var, block)
-            block.phi_nodes[ref_var] = new_phi
-            block.statements[0].phi_nodes.append(new_phi)
-            # Need to add un-labelled global
-            new_phi.update_targets(ref_var)
-    #        print("Phi created for block " + str(block.start_line_no))
-    #        print(block.phi_nodes)
-        block.has_phi_nodes = True
-        return global_phis
-            
-    def update_phis(self, block, predecessor_dict):
-        if block.start_line_no == "Exit":
+
+    def ssa_successors(self, cfg, block):
+        ''' The blocks of cfg which can follow block. Empty blocks are left
+            out as they have nothing to rename. '''
+        exits = [an_exit for an_exit in cfg.successors[block]
+                 if an_exit != cfg.exit and not cfg.is_empty(an_exit)]
+        exits.sort(key = cfg.start_line_nos.__getitem__)
+        return exits
+
+    def ssa_function(self, node):
+        ''' Renames the blocks of the function node and gives the blocks
+            where versions meet their phi nodes. '''
+        cfg = node.cfg
+        entry = 0
+        if entry == cfg.exit or cfg.is_empty(entry):
             return
-        for var, num in predecessor_dict.items():
-                    # If it doesn't exist yet - can happen when transforming global to local -
-                    # add it
-                    if var not in block.phi_nodes:
-                        new_phi = self.create_new_phi_node(var, block)
-                        block.phi_nodes[var] = new_phi
+        successors = [self.ssa_successors(cfg, block) for block in range(len(cfg))]
+        blocks = reverse_postorder(entry, successors.__getitem__)
+        predecessors = [[] for _ in successors]
+        for block in blocks:
+            for successor in successors[block]:
+                predecessors[successor].append(block)
+        idom = immediate_dominators(blocks, predecessors)
 
-                    # Don't add the var if it is itself!
-                    if var + str(num) == block.phi_nodes[var].get_var():
+        loaded, stored = self.names_used(cfg, blocks)
+        live_in = self.live_variables(blocks, successors, loaded, stored)
+        phis = self.place_phi_nodes(cfg, blocks, predecessors, idom, live_in, stored)
+
+        # Rename down the dominator tree
+        children = dominator_tree(blocks, idom)
+        exit_trackers = {}
+        to_rename = [entry]
+        while to_rename:
+            block = to_rename.pop()
+            if block == entry:
+                self.tracker = dict.fromkeys(self.func_global_stores - self.global_var_edits)
+            else:
+                self.tracker = exit_trackers[idom[block]].copy()
+            for var, (num, _) in phis.get(block, {}).items():
+                self.tracker[var] = num
+            self.process_block(cfg, block)
+            exit_trackers[block] = self.tracker
+            to_rename.extend(reversed(children[block]))
+
+        # A phi takes the versions its block's predecessors end with
+        for block, block_phis in phis.items():
+            for var, (_, new_phi) in block_phis.items():
+                if block == entry and var not in self.local_variables:
+                    # Need to add un-labelled global
+                    new_phi.update_targets(var)
+                for predecessor in predecessors[block]:
+                    if var not in exit_trackers[predecessor]:
                         continue
-                    block.phi_nodes[var].update_targets(var + str(num))
-     #               print("Phis for: " + str(block.start_line_no))
-     #               print(block.phi_nodes)
-                    
-    def create_new_phi_node(self, var, block):
+                    num = exit_trackers[predecessor][var]
+                    target = var if num is None else var + str(num)
+                    # Don't add the var if it is itself!
+                    if target != new_phi.get_var():
+                        new_phi.update_targets(target)
+            cfg.phi_nodes[block] = [new_phi for _, new_phi in block_phis.values()]
+
+    def names_used(self, cfg, blocks):
+        ''' Maps every block to the SSA-ed names it loads and those it stores
+            to. '''
+        loaded = {}
+        stored = {}
+        for block in blocks:
+            self.collecting = (set(), set())
+            try:
+                for statement in cfg.block_statements(block):
+                    self.visit(statement)
+            finally:
+                loaded[block], stored[block] = self.collecting
+                self.collecting = None
+        return loaded, stored
+
+    def live_variables(self, blocks, successors, loaded, stored):
+        ''' Maps every block to the names which may be loaded before being
+            stored to after entering it. A block counts as loading a name
+            if it loads it anywhere. '''
+        live_in = {block : set(loaded[block]) for block in blocks}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(blocks):
+                live = set(loaded[block])
+                for successor in successors[block]:
+                    live |= live_in[successor] - stored[block]
+                if len(live) != len(live_in[block]):
+                    live_in[block] = live
+                    changed = True
+        return live_in
+
+    def place_phi_nodes(self, cfg, blocks, predecessors, idom, live_in, stored):
+        ''' Maps the blocks needing phi nodes to a dict of name -> (version,
+            phi node). Locals loaded before being stored to are given a phi
+            node in the entry with no versions from before it. '''
+        entry = blocks[0]
+        frontiers = dominance_frontiers(blocks, predecessors, idom)
+        defined_in = {}
+        for block in blocks:
+            for var in stored[block]:
+                defined_in.setdefault(var, []).append(block)
+        phi_blocks = {}
+        for var in self.ssa_names:
+            needs_phi = iterated_frontier(frontiers, defined_in.get(var, []) + [entry])
+            if var in self.local_variables:
+                needs_phi.add(entry)
+            for block in needs_phi:
+                if var in live_in[block]:
+                    phi_blocks.setdefault(block, []).append(var)
+        phis = {}
+        for block in blocks:
+            if block not in phi_blocks:
+                continue
+            phis[block] = {}
+            for var in sorted(phi_blocks[block]):
+                phis[block][var] = self.create_new_phi_node(var, cfg.block_statements(block)[0].lineno)
+        return phis
+
+    def process_block(self, cfg, block):
+        # Versions from enclosing code for the names not being SSA-ed
+        self.tracker.update({k:v for k,v in self.function_ssa_tracker.items() if k not in self.tracker and k not in self.ssa_names})
+        for statement in cfg.block_statements(block):
+            self.visit(statement)
+        log.debug("Block %s to %s", cfg.start_line_nos[block], cfg.successors[block])
+
+    def create_new_phi_node(self, var, lineno):
         if var in self.function_ssa_tracker:  # Needed for before when var may not yet exist
             self.function_ssa_tracker[var] += 1
         else:
             self.function_ssa_tracker[var] = 1
-        block.tracker[var] = self.function_ssa_tracker[var]
         new_phi = Phi_Node(var + str(self.function_ssa_tracker[var]), set())
-        new_phi.lineno = block.statements[0].lineno
-        return new_phi
+        new_phi.lineno = lineno
+        return self.function_ssa_tracker[var], new_phi
                     
-    def visit(self, node):
-        '''Compute the dictionary of assignments live at any point.'''
-        method = getattr(self,'do_' + node.__class__.__name__)
-        return method(node)
-        
     def do_Name(self, node):
+        if self.collecting is not None:
+            if node.id in self.ssa_names:
+                names = self.collecting[1] if isinstance(node.ctx, ast.Store) else self.collecting[0]
+                names.add(node.id)
+            return
         # We don't SSA a global variable
    #     if node.id == "tag":
    #         pass
@@ -162,8 +195,6 @@ class SSA_Traverser(AstFullTraverser):
         # In no way will we rename a node with combination
         if node.id in self.global_variables and node.id in self.global_var_edits:
             return
-        if node.id in self.func_global_stores and node.id not in self.current_block.phi_nodes:
-            return
         # Becomes local variable in this context
         if node.id in self.global_variables and node.id not in self.global_var_edits and isinstance(node.ctx, ast.Store):
             self.global_variables.remove(node.id)
@@ -175,22 +206,23 @@ class SSA_Traverser(AstFullTraverser):
                 self.function_ssa_tracker[node.originalId] += 1
             else:
                 self.function_ssa_tracker[node.originalId] = 1
-            self.current_block.tracker[node.originalId] = self.function_ssa_tracker[node.originalId]
+            self.tracker[node.originalId] = self.function_ssa_tracker[node.originalId]
         # If it's x.y attribute and a ast.Load then for now we assume that it's already present
         ''' TODO: Check all possible attributes. '''
         if isinstance(node.ctx, ast.Load) and isinstance(node, ast.Attribute):
             return
                 
        # pprint(self.function_ssa_tracker)
-        try:
-            node.id = node.originalId + str(self.current_block.tracker[node.originalId])
-        except:
-            pass
+        num = self.tracker.get(node.originalId)
+        if num is not None:
+            node.id = node.originalId + str(num)
 
     def do_ClassDef (self, node):
         ''' - We do not assign ssa numbers to class names as it's impossible
               to track order of execution.
             - We need the global variables. Do not start with an empty d '''    
+        if self.collecting is not None:
+            return
         self.global_variables = node.global_variables | node.stc_context.global_variables
         old_tracker = self.function_ssa_tracker.copy()
         try:
@@ -203,17 +235,20 @@ class SSA_Traverser(AstFullTraverser):
     def do_FunctionDef (self, node):
         ''' Variables defined in function should not exist outside. '''
         # Don't ssa functions which dynamically generate functions or classes
-        if node.dynamic_fun_generator:
+        if node.dynamic_fun_generator or self.collecting is not None:
             return
         # Store d so we can eradicate local variables
     #    old_args = self.fun_args.copy()
         old_globals = self.global_variables.copy()
         old_locals = self.local_variables
+        old_edits = self.global_var_edits
         self.global_var_edits = node.global_var_edits
         old_tracker = self.function_ssa_tracker.copy()
         old_in_function = self.in_function
         old_func_stores = self.func_global_stores
         self.func_global_stores = node.func_global_stores
+        old_ssa_names = self.ssa_names
+        old_block_tracker = self.tracker
         
     #    args = self.visit(node.args)
     #    self.fun_args += args
@@ -223,15 +258,17 @@ class SSA_Traverser(AstFullTraverser):
         try:
             self.in_function = True
             self.local_variables = node.local_variables
-            self.add_all_phi_nodes(node.initial_block, node.local_variables)
-            self.blocks_to_process.append((node.initial_block, None))
-            self.old_func_stores = old_func_stores
-            self.process_block_list()
+            self.ssa_names = self.local_variables | (self.func_global_stores - self.global_var_edits)
+            self.ssa_function(node)
         finally:
             self.in_function = old_in_function
             self.function_ssa_tracker = old_tracker
             self.local_variables = old_locals
             self.global_variables = old_globals
+            self.global_var_edits = old_edits
+            self.func_global_stores = old_func_stores
+            self.ssa_names = old_ssa_names
+            self.tracker = old_block_tracker
      #   self.fun_args = old_args
         
     def do_arguments(self, node):
@@ -332,6 +369,34 @@ class SSA_Traverser(AstFullTraverser):
     def do_Pass(self, node):
         pass
         
+class Phi_Visiting():
+    ''' For the traversers which visit the phi nodes given by SSA_Traverser.
+        The phi nodes of a block are visited just before the statement at
+        its head. '''
+    
+    # Statement at the head of a block -> the block's phi nodes, for the
+    # function being visited
+    block_phis = {}
+    
+    def visit_statements(self, statements):
+        block_phis = self.block_phis
+        for z in statements:
+            if z in block_phis:
+                for phi in block_phis[z]:
+                    self.visit(phi)
+            self.visit(z)
+    
+    def visit_function_body(self, node):
+        ''' Visits the body of the function node along with its phi nodes. '''
+        old_block_phis = self.block_phis
+        cfg = node.cfg
+        self.block_phis = {cfg.statements[cfg.statement_starts[block]] : phis
+                           for block, phis in enumerate(cfg.phi_nodes) if phis}
+        try:
+            self.visit_statements(node.body)
+        finally:
+            self.block_phis = old_block_phis
+        
 class Phi_Node():
     ''' Class used to represent a phi node in the SSA. Allows us to represent
     a variable which is assigned to in more than one branch.
@@ -341,6 +406,8 @@ class Phi_Node():
     
     TARGET_NOT_DECLARED = 0
     
+    __slots__ = ('var', 'targets', 'lineno')
+    
     def __init__(self, var, targets):
         self.var = var
         self.targets = targets
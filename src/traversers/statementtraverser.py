@@ -20,10 +20,7 @@ class StatementTraverser(AstBaseTraverser):
     #@+node:ekr.20130317115148.9414: *4* stat.visit & default_visitor
     def visit(self,node):
 
-        assert isinstance(node,ast.AST),node.__class__.__name__
-        method_name = 'do_' + node.__class__.__name__
-        method = getattr(self,method_name,self.default_visitor)
-        return method(node)
+        return self.dispatch_table[node.__class__](self,node)
 
     def default_visitor(self,node):
         pass
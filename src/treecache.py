@@ -0,0 +1,68 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from src.treepickler import dump_tree, load_tree
+
+# Changes to any of these invalidate every cached tree.
+ANALYZER_DIR = os.path.dirname(os.path.abspath(__file__))
+_analyzer_version = None
+
+def analyzer_version():
+    ''' A digest of the analyzer's own source and the Python version, since
+        both decide what the prepared trees look like. '''
+    global _analyzer_version
+    if _analyzer_version is None:
+        digest = hashlib.sha256(sys.version.encode())
+        for root, dirs, files in os.walk(ANALYZER_DIR):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    with open(os.path.join(root, name), 'rb') as f:
+                        digest.update(f.read())
+        _analyzer_version = digest.hexdigest()
+    return _analyzer_version
+
+class TreeCache():
+    ''' An on-disk cache of prepared files keyed by the hash of their contents
+        and the analyzer version. Unchanged files skip the front end. '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, file_path):
+        digest = hashlib.sha256(analyzer_version().encode())
+        with open(file_path, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def load(self, key):
+        ''' Returns the cached value or None on a miss. A corrupt entry is
+            treated as a miss and will be overwritten. '''
+        try:
+            with open(self.path_for(key), 'rb') as f:
+                return load_tree(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def store(self, key, value):
+        ''' Writes to a temporary file first so that processes sharing the
+            cache never read half-written entries. '''
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        replaced = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                dump_tree(value, f)
+            os.replace(temp_path, self.path_for(key))
+            replaced = True
+        finally:
+            if not replaced:
+                os.remove(temp_path)
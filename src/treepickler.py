@@ -0,0 +1,135 @@
+import copyreg
+import io
+import pickle
+import sys
+
+from src.typeclasses import BUILTIN_TYPE_DICT, BaseType, Def_Type, Shared_Vars, Singleton_Meta
+from src.typechecking.basictypevariable import BasicTypeVariable
+
+# Prepared trees carry parent pointers and long chains of CFG blocks, which
+# makes pickling them deeply recursive.
+PICKLE_RECURSION_LIMIT = 20000
+
+class TreePickler(pickle.Pickler):
+    ''' Pickles prepared trees. The builtin type variables are shared by every
+        module so they are written as references to BUILTIN_TYPE_DICT rather
+        than copied into every pickle, and the variables shared by the
+        instances of a Shared_Vars class as references to the reader's own.
+        Likewise any object whose id is in shared is written as the
+        reference it maps to. '''
+
+    def __init__(self, file, drop_dependents = False, shared = None):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.builtin_names = {id(var) : name for name, var in BUILTIN_TYPE_DICT.items()}
+        self.shared = shared or {}
+        self.shared_vars_names = {id(type_class.shared_vars) : shared_vars_name(type_class)
+                                  for type_class in subclasses_of(Shared_Vars)
+                                  if 'shared_vars' in type_class.__dict__}
+        self.dispatch_table = copyreg.dispatch_table.copy()
+        for type_class in subclasses_of(BaseType):
+            self.dispatch_table[type_class] = reduce_type
+        if drop_dependents:
+            for var_class in subclasses_of(BasicTypeVariable):
+                self.dispatch_table[var_class] = reduce_without_dependents
+
+    def persistent_id(self, obj):
+        name = self.builtin_names.get(id(obj))
+        if name is not None and BUILTIN_TYPE_DICT[name] is obj:
+            return name
+        name = self.shared_vars_names.get(id(obj))
+        if name is not None:
+            return name
+        return self.shared.get(id(obj))
+
+def subclasses_of(base_class):
+    ''' Returns base_class and all of its subclasses. '''
+    classes = [base_class]
+    for subclass in base_class.__subclasses__():
+        classes.extend(subclasses_of(subclass))
+    return classes
+
+def shared_vars_name(type_class):
+    ''' The reference to the variables shared by the instances of
+        type_class. Not a builtin name, nor a reference in shared. '''
+    return type_class.__name__ + '.shared_vars'
+
+def reduce_type(type_object):
+    ''' Types hash by their kind and typed trees are full of cycles through
+        sets of types, so the kind is restored when the object is created
+        rather than with the rest of its state. Stateless types unpickle as
+        the shared instance. Unnamed functions, whose kinds are only
+    unique in the process which made them, are given new kinds by the
+    reader. '''
+    if isinstance(type_object.__class__, Singleton_Meta):
+        return (type_object.__class__, ())
+    state = slot_state(type_object)
+    kind = type_object.kind
+    if isinstance(type_object, Def_Type) and type_object.name is None:
+        kind = None
+    return (new_type, (type_object.__class__, kind), (None, state))
+
+def new_type(type_class, kind):
+    type_object = type_class.__new__(type_class)
+    if kind is None:
+        kind = Def_Type.kind_for(id(type_object))
+    type_object.kind = kind
+    return type_object
+
+def reduce_without_dependents(var):
+    ''' Pickles a type variable with an empty set of dependents. Used for
+        typed trees whose types are final, where the dependents would only
+        drag the rest of the constraint graph into the pickle. '''
+    state = slot_state(var)
+    state['constraint_dependents'] = set()
+    state['sent'] = None
+    return (copyreg.__newobj__, (var.__class__,), (None, state))
+
+def slot_state(obj):
+    ''' The attributes of obj which has no __dict__, by name. Slots which
+        were never set are left out. '''
+    state = {}
+    for obj_class in obj.__class__.__mro__:
+        for name in obj_class.__dict__.get('__slots__', ()):
+            if hasattr(obj, name):
+                state[name] = getattr(obj, name)
+    return state
+
+class TreeUnpickler(pickle.Unpickler):
+    ''' Reconnects the references written by TreePickler. shared maps the
+        references given to the pickler back to objects. '''
+
+    def __init__(self, file, shared = None):
+        super().__init__(file)
+        self.shared = shared or {}
+        self.shared_vars_classes = {shared_vars_name(type_class) : type_class
+                                    for type_class in subclasses_of(Shared_Vars)}
+
+    def persistent_load(self, pid):
+        if pid in self.shared:
+            return self.shared[pid]
+        if pid in self.shared_vars_classes:
+            return self.shared_vars_classes[pid]().get_shared_vars()
+        return BUILTIN_TYPE_DICT[pid]
+
+def dump_tree(obj, file, drop_dependents = False, shared = None):
+    ''' Writes obj to the open binary file. shared maps the ids of objects
+        the reader already has to references to them. '''
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old_limit, PICKLE_RECURSION_LIMIT))
+    try:
+        TreePickler(file, drop_dependents, shared).dump(obj)
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+def load_tree(file, shared = None):
+    ''' Reads an object written by dump_tree from the open binary file.
+        shared maps references to the objects they stand for. '''
+    return TreeUnpickler(file, shared).load()
+
+def dumps_tree(obj, drop_dependents = False, shared = None):
+    file = io.BytesIO()
+    dump_tree(obj, file, drop_dependents, shared)
+    return file.getvalue()
+
+def loads_tree(data, shared = None):
+    return load_tree(io.BytesIO(data), shared)
@@ -4,55 +4,95 @@ from src.typeclasses import Any_Type
 class ArgTypeVariable(BasicTypeVariable):
     ''' Takes the intersection of the types in all possible uses. The type is
         any if the intersection is empty.
-        self.types holds the argument type. '''
+        self.types holds the argument type.
+
+        The intersection is kept up to date as the uses change rather than
+        taken afresh, by counting the uses each kind of type appears in. A
+        kind is in the intersection when every use has it. '''
+    __slots__ = ('arg_uses', 'kind_counts', 'common_kinds')
+
     def __init__(self):
-        # Holds the types legal in each use case of the arg
+        # Use -> (its resets, the kinds counted from it)
         # We need to hold them to take the intersection
-        self.arg_uses = set()
-        
+        self.arg_uses = {}
+        # Kind -> [number of uses with that kind, a type of that kind]
+        self.kind_counts = {}
+        # The kinds every use has
+        self.common_kinds = set()
+
         super().__init__()
         # Needed in case it's never used
-        self.types.add(Any_Type())
-        
+        self.add_types([Any_Type()])
+
+    def count_use(self, use):
+        ''' Counts the types of use not already counted. Returns whether the
+            intersection changed. '''
+        # Types are only taken away on a reset, including that of any
+        # variable use is merged into
+        resets = use.find().resets
+        counted = self.arg_uses.get(use)
+        if counted is None:
+            # A new use, so a kind is only common again once counted in it.
+            # The common kinds can then only shrink.
+            common_before = len(self.common_kinds)
+            self.common_kinds = set()
+            counted = (resets, set())
+            self.arg_uses[use] = counted
+        elif counted[0] != resets:
+            # Types were taken from use, so count it again from the start.
+            # Kinds may leave and join, which is rare enough to compare.
+            common_before = self.common_kinds.copy()
+            self.uncount_kinds(counted[1])
+            counted = (resets, set())
+            self.arg_uses[use] = counted
+        else:
+            # Only new types, so the common kinds can only grow
+            common_before = len(self.common_kinds)
+        kinds = counted[1]
+        for new_type in use.new_types_for(self):
+            if new_type.kind in kinds:
+                continue
+            kinds.add(new_type.kind)
+            count = self.kind_counts.get(new_type.kind)
+            if count is None:
+                count = [0, new_type]
+                self.kind_counts[new_type.kind] = count
+            count[0] += 1
+            if count[0] == len(self.arg_uses):
+                self.common_kinds.add(new_type.kind)
+        if isinstance(common_before, set):
+            return self.common_kinds != common_before
+        return len(self.common_kinds) != common_before
+
+    def uncount_kinds(self, kinds):
+        ''' Takes away a use's count of kinds. '''
+        for kind in kinds:
+            count = self.kind_counts[kind]
+            count[0] -= 1
+            if not count[0]:
+                del self.kind_counts[kind]
+            self.common_kinds.discard(kind)
+
     def extract_types(self):
-        ''' Take the intersection of type variables in arg_uses. '''
-        uses_in_list = list(self.arg_uses)
-        extracted = set()
-        first_use = uses_in_list.pop()
-        extracted |= first_use.get()
-        for possible_use in uses_in_list:
-            new_extracted = set()
-            for possible_type in possible_use.get():
-                intersection = any([x.kind == possible_type.kind for x in extracted])
-                if intersection:
-                    new_extracted.add(possible_type)
-            extracted = new_extracted
+        ''' The types of the kinds common to every use, or Any if none are. '''
+        extracted = set(self.kind_counts[kind][1] for kind in self.common_kinds)
         # Add any if intersection is empty
         if not extracted:
             extracted.add(Any_Type())
         return extracted
-    
-    def is_same_as_self(self, other):
-        for possible_type in self.types:
-            if not any([x.kind == possible_type.kind for x in other.get()]):
-                return False
-        for possible_type in other.get():
-            if not any([x.kind == possible_type.kind for x in self.types]):
-                return False
-        return True
-    
+
     def receive_update(self, other):
         ''' Can receive updates from its use cases.
              We don't want to check extracted is a subset of current types,
              but has changes since it can get smaller. '''
         assert isinstance(other, BasicTypeVariable)
         # Add it to the possible uses
-        self.arg_uses.add(other)
+        if not self.count_use(other):
+            return
         extracted = self.extract_types()
-        if self.is_same_as_self(BasicTypeVariable(list(extracted))):
+        # e.g. no kinds in common and only Any in common both give Any
+        if self.types == extracted:
             return
         # Replace contents with extracted
-        self.types.clear()
-        self.types |= extracted
+        self.replace_types(extracted)
         self.update_all_dependents()
-        
@@ -1,12 +1,33 @@
+from src.typechecking.worklist import WORKLIST
+from src.typechecking.typeset import TypeSet
+
 class BasicTypeVariable:
     ''' This simulates a C style pointer to a set of types.
         This is a basic type variable. It is only capable of creating a simple
         subset constraint from variables '''
     
+    # There are a great many of these, so they're kept without a __dict__.
+    # Subclasses list their own attributes in __slots__ too.
+    __slots__ = ('types', 'constraint_dependents', 'added', 'sent', 'resets', 'merged_into',
+                 'merged')
+    
     def __init__(self, types = []):
         assert isinstance(types, list)
-        self.types = set(types)
+        self.types = TypeSet(types)
         self.constraint_dependents = set()
+        # The types in the order they were added, so that a dependent only
+        # needs to be sent those added since it was last updated. Only kept
+        # from the first time a dependent asks, as most variables never
+        # change.
+        self.added = None
+        # Dependent -> (resets, position in added) when it was last updated
+        self.sent = None
+        # Bumped whenever types are taken away
+        self.resets = 0
+        # The variable this one was merged into as part of a cycle, and
+        # the variables merged into this one
+        self.merged_into = None
+        self.merged = None
 
     def __str__(self):
         return self.types.__repr__()
@@ -19,7 +40,7 @@ class BasicTypeVariable:
     def __ior__(self, other):
         ''' Implements self |= other '''
         assert isinstance(other, BasicTypeVariable)
-        self.types |= other.types
+        self.add_types(other.types)
         return self
         
     def __iter__(self):
@@ -31,12 +52,61 @@ class BasicTypeVariable:
     def get(self):
         return self.types
     
+    def find(self):
+        ''' The variable standing for this one, i.e. itself unless it was
+            merged into another. '''
+        if self.merged_into is None:
+            return self
+        return self.merged_into
+    
+    def add_types(self, new_types):
+        ''' Adds new_types, returning whether any weren't already here. '''
+        if self.merged_into is not None:
+            return self.find().add_types(new_types)
+        any_change = False
+        for new_type in new_types:
+            if new_type not in self.types:
+                self.types.add(new_type)
+                if self.added is not None:
+                    self.added.append(new_type)
+                any_change = True
+        if any_change and WORKLIST.needs_widening(self.types):
+            self.widen()
+        return any_change
+    
+    def widen(self):
+        ''' Gives up on the types, which have grown too many, replacing them
+            with Any. Dependents are then sent Any as if it were new. '''
+        # typeclasses needs this module, so Any_Type can't be imported at
+        # the top
+        from src.typeclasses import Any_Type
+        self.replace_types([Any_Type()])
+        WORKLIST.widenings += 1
+    
+    def replace_types(self, new_types):
+        ''' Replaces the types. Dependents are then sent all of them. '''
+        self.types.clear()
+        self.types |= new_types
+        self.added = None
+        self.resets += 1
+        
+    def new_types_for(self, dependent):
+        ''' Returns the types added since dependent was last sent them. '''
+        if self.merged_into is not None:
+            return self.find().new_types_for(dependent)
+        if self.added is None:
+            self.added = list(self.types)
+        if self.sent is None:
+            self.sent = {}
+        resets, position = self.sent.get(dependent, (self.resets, 0))
+        if resets != self.resets:
+            position = 0
+        self.sent[dependent] = (self.resets, len(self.added))
+        return self.added[position:]
+    
     def update_types(self, other):
         assert isinstance(other, BasicTypeVariable)
-        if self.is_subset_of_self(other):
-            return False
-        self.types |= other.types
-        return True
+        return self.add_types(other.new_types_for(self))
     
     def is_subset_of_self(self, other):
         assert isinstance(other, BasicTypeVariable)
@@ -46,6 +116,9 @@ class BasicTypeVariable:
         ''' Add the new dependent to the list and send it this variable's
             types. '''
         assert isinstance(new_dependent, BasicTypeVariable)
+        if new_dependent is not self and new_dependent.find() is self.find():
+            # Within a merged cycle
+            return
         self.constraint_dependents.add(new_dependent)
         self.update_dependent(new_dependent)
         
@@ -55,7 +128,7 @@ class BasicTypeVariable:
             self.update_dependent(dependent)
         
     def update_dependent(self, dependent):
-        dependent.receive_update(self)
+        WORKLIST.add(dependent, self)
     
     def receive_update(self, sender):
         ''' Receive the update and propagate it the dependents. '''
@@ -63,6 +136,93 @@ class BasicTypeVariable:
         any_change = self.update_types(sender)
         if any_change:
             self.update_all_dependents()
+        elif type(self) is BasicTypeVariable and type(sender) is BasicTypeVariable:
+            if self.find() is not sender.find() and self.types == sender.types:
+                WORKLIST.check_for_cycle(sender, self)
+        
+    def cycle_successors(self):
+        ''' The plain variables this one is a plain subset of which hold the
+            same types, i.e. those it could share a settled cycle with. '''
+        successors = []
+        for dependent in self.constraint_dependents:
+            dependent = dependent.find()
+            if (type(dependent) is BasicTypeVariable and dependent is not self and
+                dependent.types == self.types):
+                successors.append(dependent)
+        return successors
+    
+    def collapse_cycles(self):
+        ''' Merges every cycle of plain variables holding the same types as
+            this one, and reachable from it, into a single variable. Returns
+            the number of variables merged away. '''
+        merged = 0
+        for cycle in plain_cycles_from(self.find()):
+            # Keep the variable with the most merged into it already, so the
+            # fewest need to be pointed at another
+            cycle.sort(key = lambda var: len(var.merged or ()), reverse = True)
+            cycle[0].merge(cycle[1:])
+            merged += len(cycle) - 1
+        return merged
+    
+    def merge(self, others):
+        ''' Makes this variable stand for others, which are plain variables
+            holding the same types. They, and any variables merged into them
+            before, share this variable's types and dependents from now on
+            while anything still pointing at them is passed on to this one. '''
+        if self.merged is None:
+            self.merged = []
+        for other in others:
+            self.constraint_dependents |= other.constraint_dependents
+            for member in [other] + (other.merged or []):
+                member.types = self.types
+                member.constraint_dependents = self.constraint_dependents
+                member.added = None
+                member.sent = None
+                member.merged_into = self
+                member.merged = None
+                self.merged.append(member)
+        # Edges within the cycle would only send the types around again
+        within = [dependent for dependent in self.constraint_dependents if dependent.find() is self]
+        self.constraint_dependents.difference_update(within)
+
+def plain_cycles_from(start):
+    ''' Tarjan's algorithm over the variables reachable from start through
+        cycle_successors, without recursion as chains of assignments can be
+        long. Returns the components with more than one variable. '''
+    index = {start : 0}
+    lowlink = {start : 0}
+    stack = [start]
+    on_stack = {start}
+    cycles = []
+    # Each frame is a variable and an iterator over its successors
+    frames = [(start, iter(start.cycle_successors()))]
+    while frames:
+        var, successors = frames[-1]
+        for successor in successors:
+            if successor not in index:
+                index[successor] = lowlink[successor] = len(index)
+                stack.append(successor)
+                on_stack.add(successor)
+                frames.append((successor, iter(successor.cycle_successors())))
+                break
+            if successor in on_stack:
+                lowlink[var] = min(lowlink[var], index[successor])
+        else:
+            frames.pop()
+            if frames:
+                predecessor = frames[-1][0]
+                lowlink[predecessor] = min(lowlink[predecessor], lowlink[var])
+            if lowlink[var] == index[var]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member is var:
+                        break
+                if len(component) > 1:
+                    cycles.append(component)
+    return cycles
         
         
         
@@ -6,6 +6,8 @@ class BinOpTypeVariable(BasicTypeVariable):
     ''' Represents a binary operation. The types must be given in the order
         left-right.
         self.types represents the types the binop can result in. '''
+    __slots__ = ('lineno', 'left_types', 'right_types', 'op', 'left_param', 'right_param')
+    
     def __init__(self, node, left, right, op, left_param, right_param):
         assert isinstance(left, BasicTypeVariable)
         assert isinstance(right, BasicTypeVariable)
@@ -35,22 +37,32 @@ class BinOpTypeVariable(BasicTypeVariable):
             return set()
                   
         self.infer_arguments()
+        return self.combine(left_ts, right_ts)
+    
+    def extract_new_types(self, sender):
+        ''' As extract_types but only for the combinations involving the
+            types new to sender. '''
+        left_ts = self.left_types.get()
+        right_ts = self.right_types.get()
+        if sender is not self.left_types and sender is not self.right_types:
+            return self.extract_types()
+        new_ts = sender.new_types_for(self)
         
+        if len(left_ts) == 0 or len(right_ts) == 0:
+            return set()
+        
+        self.infer_arguments()
         extracted = set()
-        for left in left_ts:
-            for right in right_ts:
-                if isinstance(left, Any_Type) and isinstance(right, Any_Type):
-                    extracted.add(Any_Type())
-                    continue
-                if isinstance(left, Any_Type):
-                    extracted |= binop_cons.get_right_return_types(self.op, right)
-                    continue
-                if isinstance(right, Any_Type):
-                    extracted |= binop_cons.get_left_return_types(self.op, left)
-                    continue
-                extracted |= binop_cons.get_return_type(self.op, left, right)
+        if sender is self.left_types:
+            extracted |= self.combine(new_ts, right_ts)
+        if sender is self.right_types:
+            extracted |= self.combine(left_ts, new_ts)
         return extracted
     
+    def combine(self, left_ts, right_ts):
+        ''' The types resulting from every pair of left and right types. '''
+        return binop_cons.get_combined_return_types(self.op, left_ts, right_ts)
+    
     def infer_arguments(self):
         ''' If function arguments are used in a binop then infer their possible
             types. '''
@@ -75,9 +87,5 @@ class BinOpTypeVariable(BasicTypeVariable):
     
     def update_types(self, other):
         assert isinstance(other, BasicTypeVariable)
-        extracted = self.extract_types()
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
-            return False
-        self.types |= extracted
-        return True
+        return self.add_types(self.extract_new_types(other))
         
\ No newline at end of file
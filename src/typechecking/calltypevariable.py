@@ -1,6 +1,5 @@
 from src.typechecking.basictypevariable import BasicTypeVariable
 from src.typeclasses import Any_Type, Class_Type, Class_Instance, Def_Type
-from itertools import product
 
 class CallTypeVariable(BasicTypeVariable):
     ''' Must work for modules and classes.
@@ -9,12 +8,21 @@ class CallTypeVariable(BasicTypeVariable):
         If type is a class def then check __init__
         If function - obvious
         If class instance - call '''
+    __slots__ = ('lineno', 'has_callable_type', 'args', 'function_ident', 'fun_args', 'instances',
+                 'matched')
+    
     def __init__(self, args, node, function_ident, fun_args):
         self.lineno = node.lineno
         self.has_callable_type = False
         self.args = args
         self.function_ident = function_ident
         self.fun_args = fun_args
+        # id(class type) -> (class type, the instance this call makes of it)
+        self.instances = {}
+        # (function, argument position) -> (given resets, number of given
+        # types, accepted resets, number of accepted types, whether
+        # accepted) as last checked. See argument_accepted.
+        self.matched = None
         
         super().__init__()
         
@@ -45,7 +53,7 @@ class CallTypeVariable(BasicTypeVariable):
                         continue
                     init_func = self.extract_func_from_typevar(init_func_var)
                     if self.check_parameter_types(init_func):
-                        extracted |= possible_type.get_return_types().types
+                        extracted.add(self.instance_of(possible_type))
                         self.has_callable_type = True
                         continue
                 elif self.check_parameter_types(possible_type):
@@ -53,6 +61,15 @@ class CallTypeVariable(BasicTypeVariable):
                     extracted |= possible_type.get_return_types().types
         return extracted
     
+    def instance_of(self, class_type):
+        ''' The instance of class_type made by this call. Only made once, so
+            updates reaching the call don't make new ones. '''
+        made = self.instances.get(id(class_type))
+        if made is None or made[0] is not class_type:
+            made = (class_type, class_type.new_instance())
+            self.instances[id(class_type)] = made
+        return made[1]
+    
     def extract_func_from_typevar(self, typevar):
         ''' Extracts the first function that it comes across.
             Used to get __init__ and __call__ functions.
@@ -86,14 +103,8 @@ class CallTypeVariable(BasicTypeVariable):
             if self.args[i] in self.fun_args:
                 given_params_and_types.append((self.args[i], parameter_types[i]))
                 continue
-            given_arg = self.args[i].get()
-            accepted_types = parameter_types[i].get()
-            # If either are any_type then it succeeds
-            if any([isinstance(arg, Any_Type) for arg in given_arg | accepted_types]):
-                continue
-            if any([x <= y for x, y in product(given_arg, accepted_types)]):
-                continue
-            return False
+            if not self.argument_accepted(candidate_function, i, self.args[i], parameter_types[i]):
+                return False
         # All other arguments are acceptable so assign types to any function parameters
         for given_param, accepted_types in given_params_and_types:
             accepted_types.add_new_dependent(given_param)
@@ -101,11 +112,46 @@ class CallTypeVariable(BasicTypeVariable):
                 
         
     
+    def argument_accepted(self, candidate_function, position, given, accepted):
+        ''' Whether the argument given at position is acceptable to the
+            parameter there. A variable only gains types until it is reset,
+            so an argument once accepted stays accepted until either is
+            reset, and one refused stays refused until either changes. '''
+        given = given.find()
+        accepted = accepted.find()
+        if self.matched is None:
+            self.matched = {}
+        key = (candidate_function, position)
+        checked = self.matched.get(key)
+        if checked is not None and checked[4] and checked[0] == given.resets and \
+        checked[2] == accepted.resets:
+            return True
+        version = (given.resets, len(given.types), accepted.resets, len(accepted.types))
+        if checked is not None and checked[:4] == version:
+            return checked[4]
+        is_accepted = accepts(given.types, accepted.types)
+        self.matched[key] = version + (is_accepted,)
+        return is_accepted
+    
     def receive_update(self, other):
         ''' Can receive updates from its identifier as well as the arg types. Doesn't matter which '''
         assert isinstance(other, BasicTypeVariable)
         extracted = self.extract_types()
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
+        if not self.add_types(extracted):
             return
-        self.types |= extracted
-        self.update_all_dependents()
\ No newline at end of file
+        self.update_all_dependents()
+
+def accepts(given_types, accepted_types):
+    ''' Whether any of given_types <= any of accepted_types. Rather than
+        comparing every pair, the accepted types are looked up by kind and
+        by class, a type being <= any type whose class it inherits from. '''
+    # If either are any_type then it succeeds
+    if Any_Type() in given_types or Any_Type() in accepted_types:
+        return True
+    accepted_classes = {accepted_type.__class__ for accepted_type in accepted_types}
+    for given_type in given_types:
+        if given_type in accepted_types:
+            return True
+        if any(type_class in accepted_classes for type_class in given_type.__class__.__mro__):
+            return True
+    return False
@@ -7,6 +7,9 @@ class ClassTypeVariable(BasicTypeVariable):
     
     ''' TODO: Combine two functions into one. '''
     
+    __slots__ = ('base_classes', 'class_variables', 'acceptable_base_classes', 'any_base_class',
+                 'found_special_methods', 'class_type', 'base_names_seen')
+    
     def __init__(self, base_classes, self_variables, name):
         ''' Base classes must be given in the correct order. '''
         self.base_classes = base_classes
@@ -15,6 +18,9 @@ class ClassTypeVariable(BasicTypeVariable):
         self.acceptable_base_classes = set()
         self.any_base_class = False
         self.found_special_methods = set()
+        # id(base class type) -> (base class type, the names of its
+        # variables already added or shared by check_new_vars)
+        self.base_names_seen = {}
         
         self.initialise_vars(self_variables)
         self.class_type = Class_Type(name, self.class_variables)
@@ -68,13 +74,20 @@ class ClassTypeVariable(BasicTypeVariable):
                     self.any_base_class = True
                     change = True
                     
+                # Only the names the base class has gained since it was
+                # last looked at
+                base_vars = possible_type.get_vars()
+                seen = self.names_seen_in(possible_type)
+                new_names = base_vars.keys() - seen
+                seen |= new_names
+                
                 # If there is a clash, the first instance will be used
-                new_vars = {k:v for k,v in possible_type.get_vars().items() if k not in self.class_variables}
+                new_vars = {k:base_vars[k] for k in new_names if k not in self.class_variables}
                 
                 # If there's a clash, share the types except for __init__!
-                shared_keys = [k for k,_ in possible_type.get_vars().items() if k in self.class_variables and k != "__init__"]
+                shared_keys = [k for k in new_names if k in self.class_variables and k != "__init__"]
                 for k in shared_keys:
-                    their_shared_var = possible_type.get_vars()[k]
+                    their_shared_var = base_vars[k]
                     this_shared_var = self.class_variables[k]
                     their_shared_var.add_new_dependent(this_shared_var)
                     this_shared_var.add_new_dependent(their_shared_var)
@@ -85,6 +98,14 @@ class ClassTypeVariable(BasicTypeVariable):
                 self.acceptable_base_classes.add(base_class)
          return change
      
+    def names_seen_in(self, base_type):
+        ''' The names of the variables of base_type already dealt with. '''
+        seen = self.base_names_seen.get(id(base_type))
+        if seen is None or seen[0] is not base_type:
+            seen = (base_type, set())
+            self.base_names_seen[id(base_type)] = seen
+        return seen[1]
+     
     def add_special_class_types(self):
         ''' For things like __iter__ '''
         if self.class_type.get_global_var("__iter__") and "__iter__" not in self.found_special_methods:
@@ -100,11 +121,21 @@ class ClassTypeVariable(BasicTypeVariable):
             self.add_new_dependent(INDEX_TYPES)
             self.found_special_methods.add("__contains__")
     
+    def base_class_sending(self, sender):
+        ''' The base class which sender stands for, if any. A base class
+            merged into a cycle sends its updates through the variable it
+            was merged into. '''
+        for base_class in self.base_classes:
+            if base_class.find() is sender.find():
+                return base_class
+        return None
+    
     def receive_update(self, other):
         ''' Can be updated by a base class. '''
         assert isinstance(other, BasicTypeVariable)
-        if other in self.base_classes:
-            new_vars = self.check_new_vars(other)
+        base_class = self.base_class_sending(other)
+        if base_class is not None:
+            new_vars = self.check_new_vars(base_class)
             if new_vars:
                 self.update_all_dependents()
                 # Add special stuff for magic methods
@@ -2,6 +2,8 @@ from src.typechecking.basictypevariable import BasicTypeVariable
 
 class ContentsTypeVariable( BasicTypeVariable):
     
+    __slots__ = ()
+    
     def __init__(self, types = []):
         assert isinstance(types, list)
 
@@ -9,17 +11,13 @@ class ContentsTypeVariable( BasicTypeVariable):
         
     def extract_types(self, to_extract):
         ''' We want to extract the contents from each one. '''
-        assert isinstance(to_extract, BasicTypeVariable)
         extracted = set()
-        for possible_type in to_extract.get():
+        for possible_type in to_extract:
                 extracted |= possible_type.get_contents_types()
         return extracted
     
     def update_types(self, other):
         assert isinstance(other, BasicTypeVariable)
-        extracted = self.extract_types(other)
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
-            return False
-        self.types |= extracted
-        return True
+        # Only the types new to other can give anything new
+        return self.add_types(self.extract_types(other.new_types_for(self)))
         
\ No newline at end of file
@@ -3,6 +3,8 @@ from src.typeclasses import Class_Base, Any_Type
 class GetAttrTypeVariable(BasicTypeVariable):
     ''' Must work for modules and classes.
         self.types represents the types the attribute can take '''
+    __slots__ = ('value', 'attr', 'found_attributes', 'missing_attribute')
+    
     def __init__(self, value, attr, node):
         assert isinstance(value, BasicTypeVariable)
         
@@ -10,9 +12,13 @@ class GetAttrTypeVariable(BasicTypeVariable):
         self.attr = attr
         
         self.found_attributes = set()
+        # The types of value looked in which don't have the attribute, or
+        # only share a variable for it. They are looked in again on each
+        # update as it may have been set since.
+        self.missing_attribute = set()
         super().__init__()
         
-        output_types = self.extract_class_attrs()
+        self.add_types(self.extract_class_attrs())
         
     def check_output(self):
         ''' We need the output types to not be empty.
@@ -20,15 +26,27 @@ class GetAttrTypeVariable(BasicTypeVariable):
         return self.types
         
     def extract_class_attrs(self):
+        ''' Looks for the attribute in the types new to value and in those
+            which didn't have it before. The types of an attribute already
+            found arrive as updates from its variable. '''
         any_base = False
         extracted = set()
         new_dependents = set()
-        for possible_type in self.value:
+        looking_in = self.missing_attribute
+        looking_in.update(self.value.new_types_for(self))
+        self.missing_attribute = set()
+        for possible_type in looking_in:
             if isinstance(possible_type, Any_Type):
                 extracted.add(Any_Type())
                 continue
             has_attr = possible_type.get_global_var(self.attr)
-            if has_attr:
+            if has_attr and possible_type.shares_var(self.attr):
+                # Never changes, so there are no updates to wait for
+                extracted |= has_attr.types
+                self.missing_attribute.add(possible_type)
+            elif has_attr:
+                if has_attr in self.found_attributes:
+                    continue
                 # Need to add it in case this attribute updates as the
                 # class will not update when a member changes
                 self.found_attributes.add(has_attr)
@@ -36,29 +54,28 @@ class GetAttrTypeVariable(BasicTypeVariable):
                 #has_attr.add_new_dependent(self)
                 extracted |= has_attr.types
             else:
+                self.missing_attribute.add(possible_type)
                 any_base = True if possible_type.has_any_base() else any_base
         for new_dep in new_dependents:
             new_dep.add_new_dependent(self)
         # If the attr hasn't been found but has any base then
         # it might be there but we can't see it! Any_Type()
-        if not extracted and any_base:
+        if not extracted and not self.types and any_base:
             extracted.add(Any_Type())
         return extracted
     
-    def extract_from_attrs(self, other):
-        extracted = other.types
-        return extracted
-    
     def receive_update(self, other):
-        ''' Can only receive updates from its identifier.
-            i.e. x in x.f '''
+        ''' Can receive updates from its identifier and the attributes found.
+            i.e. x and f in x.f '''
         assert isinstance(other, BasicTypeVariable)
-        if other in self.found_attributes:
-            extracted = self.extract_from_attrs(other)
-        else:
-            # From the class
+        if other.find() is self.value.find():
             extracted = self.extract_class_attrs()
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
+            if other in self.found_attributes:
+                # The identifier is also its own attribute
+                extracted |= other.types
+        else:
+            # From an attribute, perhaps through a variable it was merged into
+            extracted = other.new_types_for(self)
+        if not self.add_types(extracted):
             return
-        self.types |= extracted
         self.update_all_dependents()
\ No newline at end of file
@@ -3,6 +3,8 @@ from src.typeclasses import Any_Type
 
 class IndexTypeVariable(BasicTypeVariable):
     
+    __slots__ = ()
+    
     def __init__(self, types = []):
         assert isinstance(types, list)
 
@@ -13,18 +15,14 @@ class IndexTypeVariable(BasicTypeVariable):
         
     def extract_types(self, to_extract):
         ''' We want to extract the contents from each one. '''
-        assert isinstance(to_extract, BasicTypeVariable)
         extracted = set()
-        for possible_type in to_extract.get():
+        for possible_type in to_extract:
                 if possible_type.get_global_var("__getitem__") or isinstance(possible_type, Any_Type):
                     extracted |= possible_type.get_contents_types()
         return extracted
     
     def update_types(self, other):
         assert isinstance(other, BasicTypeVariable)
-        extracted = self.extract_types(other)
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
-            return False
-        self.types |= extracted
-        return True
+        # Only the types new to other can give anything new
+        return self.add_types(self.extract_types(other.new_types_for(self)))
         
@@ -0,0 +1,170 @@
+''' Types the strongly connected components of the import graph in a pool of
+    worker processes. A component is sent off as soon as every component it
+    imports from is typed. The workers only see the modules of their own
+    component along with a summary of every module it imports, directly or
+    not, being that module's Module_Type with the finished types of its
+    variables.
+
+    Objects exported by one module are pickled in full only once, in the
+    summary of its own component. Everywhere else they are written as
+    references which the reader resolves against the summaries it has
+    already loaded.
+
+    Unlike TypeInferrer.run the modules of a component can't change the
+    types of the modules they import, so e.g. the arguments given to an
+    imported function don't reach its parameters. '''
+
+import queue
+from multiprocessing import Pool
+
+from src.importgraph import build_import_graph, file_tree_to_list, strongly_connected_components
+from src.typechecking.errorissuer import ErrorIssuer
+from src.typechecking.typeinferrer import TypeInferrer
+from src.typechecking.worklist import WORKLIST, set_type_limits
+from src.stats import Statistics
+from src.treepickler import dumps_tree, loads_tree
+
+class ImportedModule():
+    ''' Stands in for a PyFile typed elsewhere. Only its exports are known. '''
+
+    def __init__(self, path, name, module_type):
+        self.relative_path = path
+        self.name = name
+        self.path_and_name = path + "/" + name
+        self.module_type = module_type
+
+    def get_name(self):
+        return self.name
+
+    def get_path(self):
+        return self.relative_path
+
+    def has_been_typed(self):
+        return True
+
+    def get_module_type(self):
+        return self.module_type
+
+def exports_of(key, module_type):
+    ''' Maps references to the module type of the module key, its variables
+        and the types they hold. The references only depend on names and
+        kinds so both sides of a pickle can build them. '''
+    exports = {(key,) : module_type}
+    for name, var in module_type.get_vars().items():
+        exports[(key, name)] = var
+        for var_type in var.get():
+            exports[(key, name, var_type.kind)] = var_type
+    return exports
+
+def references_to(exports):
+    ''' The shared argument for pickling against exports. '''
+    return {id(obj) : reference for reference, obj in exports.items()}
+
+def type_in_pool(file_tree, error_issuer, stats, jobs):
+    ''' Types file_tree in place using jobs processes. The issues and counts
+        from the workers are added to error_issuer and stats. '''
+    graph = build_import_graph(file_tree)
+    file_list = file_tree_to_list(file_tree)
+    files = {file.path_and_name : file for file in file_list}
+    position = {file.path_and_name : i for i, file in enumerate(file_list)}
+    components = strongly_connected_components(graph)
+    component_of = {}
+    for i, component in enumerate(components):
+        # Same order within a cycle as TypeInferrer.run
+        component.sort(key = position.get)
+        for key in component:
+            component_of[key] = i
+    # The components each one is waiting on, those waiting on it and all of
+    # the components it needs summaries of. The components come dependencies
+    # first so the last can be filled in one pass.
+    waiting_on = []
+    importers = [set() for _ in components]
+    needed = []
+    for i, component in enumerate(components):
+        imported = {component_of[imported_key] for key in component for imported_key in graph[key]}
+        imported.discard(i)
+        waiting_on.append(imported)
+        for imported_component in imported:
+            importers[imported_component].add(i)
+        needed.append(set(imported).union(*(needed[j] for j in imported)))
+
+    # Per component: its pickled summary and the exports of its typed files
+    # as seen by this process
+    summaries = [None] * len(components)
+    exports = [None] * len(components)
+    issues = [[] for _ in components]
+    finished = queue.Queue()
+    with Pool(jobs, initializer = set_type_limits,
+              initargs = (WORKLIST.max_types, WORKLIST.max_types_per_class)) as pool:
+        def start(i):
+            component = components[i]
+            imported_exports = {}
+            for j in needed[i]:
+                imported_exports.update(exports[j])
+            if all(files[key].has_been_typed() for key in component):
+                # Typed by an earlier run, only the summary is needed
+                module_types = [files[key].get_module_type() for key in component]
+                summary = dumps_tree(module_types, True, references_to(imported_exports))
+                finished.put((i, (None, summary)))
+                return
+            # Dependencies first so every reference can be resolved
+            imported = [(components[j], summaries[j]) for j in sorted(needed[i])]
+            args = (dumps_tree([files[key] for key in component]), imported)
+            pool.apply_async(type_component, (args,),
+                             callback = lambda result: finished.put((i, result)),
+                             error_callback = lambda error: finished.put((i, error)))
+
+        for i in range(len(components)):
+            if not waiting_on[i]:
+                start(i)
+        for _ in range(len(components)):
+            i, result = finished.get()
+            if isinstance(result, BaseException):
+                raise result
+            typed_data, summaries[i] = result
+            if typed_data:
+                imported_exports = {}
+                for j in needed[i]:
+                    imported_exports.update(exports[j])
+                typed_files, issues[i], component_stats = loads_tree(typed_data, imported_exports)
+                for file in typed_files:
+                    files[file.path_and_name] = file
+                    file_tree[file.get_path()][file.get_name()] = file
+                stats.add(component_stats)
+            exports[i] = {}
+            for key in components[i]:
+                exports[i].update(exports_of(key, files[key].get_module_type()))
+            for importer in importers[i]:
+                waiting_on[importer].discard(i)
+                if not waiting_on[importer]:
+                    start(importer)
+
+    # Added in import order so that the issues come out the same every run
+    for component_issues in issues:
+        for issue in component_issues:
+            error_issuer.add_issue(issue)
+
+def type_component(args):
+    ''' Worker side of type_in_pool. Types the modules of one component and
+        returns them pickled with their issues and counts, along with the
+        summary of the component. '''
+    files_data, imported = args
+    files = loads_tree(files_data)
+    file_tree = {}
+    imported_exports = {}
+    for keys, summary in imported:
+        module_types = loads_tree(summary, imported_exports)
+        for key, module_type in zip(keys, module_types):
+            path, name = key.rsplit("/", 1)
+            file_tree.setdefault(path, {})[name] = ImportedModule(path, name, module_type)
+            imported_exports.update(exports_of(key, module_type))
+    for file in files:
+        file_tree.setdefault(file.get_path(), {})[file.get_name()] = file
+
+    error_issuer = ErrorIssuer()
+    stats = Statistics()
+    TypeInferrer(error_issuer, stats).type_files(files, file_tree)
+    references = references_to(imported_exports)
+    typed_data = dumps_tree((files, error_issuer.issues, stats), True, references)
+    summary = dumps_tree([file.get_module_type() for file in files], True, references)
+    return typed_data, summary
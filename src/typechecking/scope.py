@@ -0,0 +1,42 @@
+from src.typechecking.basictypevariable import BasicTypeVariable
+from src.typeclasses import BUILTIN_TYPE_DICT
+
+class Scope(dict):
+    ''' The variables of a module, class or function.
+
+        The builtins are not copied into every scope. Reading a builtin which
+        the scope doesn't define gives a variable holding the types of the
+        builtin, made the first time it is read. Nested scopes ask their
+        parent, so every scope in a module shares the module's variable. The
+        variables in BUILTIN_TYPE_DICT are never given to a module, so they
+        never gain dependents and updates to a builtin in one module don't
+        reach any other.
+
+        Membership and iteration only cover the variables defined in the
+        scope. '''
+
+    def __init__(self, parent = None):
+        super().__init__(parent or ())
+        self.parent = parent if isinstance(parent, Scope) else None
+        # Name -> this module's variable for the builtin
+        self.builtins = {}
+
+    def __missing__(self, name):
+        if name not in BUILTIN_TYPE_DICT:
+            raise KeyError(name)
+        if self.parent is not None:
+            return self.parent[name]
+        var = self.builtins.get(name)
+        if var is None:
+            var = BasicTypeVariable(list(BUILTIN_TYPE_DICT[name].get()))
+            self.builtins[name] = var
+        return var
+
+    def get(self, name, default = None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def copy(self):
+        return Scope(self)
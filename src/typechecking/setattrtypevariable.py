@@ -6,6 +6,8 @@ class SetAttrTypeVariable(BasicTypeVariable):
         self.types represents the types the attribute assigns.
         
         This class adds its own dependents '''
+    __slots__ = ('value', 'attr')
+    
     def __init__(self, value, attr, node):
         assert isinstance(value, BasicTypeVariable)
         
@@ -17,12 +19,11 @@ class SetAttrTypeVariable(BasicTypeVariable):
         dependents = set()
         for possible_type in self.value:
             if isinstance(possible_type, Class_Base):
+                new_dependent = possible_type.get_own_var(self.attr)
                 # Doesn't have the var yet, create a new type var for it
-                if self.attr not in possible_type.get_vars():
+                if new_dependent is None:
                     new_dependent = BasicTypeVariable()
                     possible_type.set_var(self.attr, new_dependent)
-                else:
-                    new_dependent = possible_type.get_global_var(self.attr)
                 if new_dependent not in self.constraint_dependents:
                     dependents.add(new_dependent)
         return dependents
@@ -34,8 +35,9 @@ class SetAttrTypeVariable(BasicTypeVariable):
         ''' Can receive updates from the types it receives and the class
             identifier '''
         assert isinstance(sender, BasicTypeVariable)
-        # Receiving from class identifier - find new classes it can be
-        if sender == self.value:
+        # Receiving from class identifier - find new classes it can be.
+        # It sends through the variable it was merged into, if any.
+        if sender.find() is self.value.find():
             new_dependents = self.find_new_dependents()
             self.constraint_dependents |= new_dependents
             for new_dep in new_dependents:
@@ -1,9 +1,11 @@
 import ast
+import logging
 from pprint import pprint
 
 from src.traversers.astfulltraverser import AstFullTraverser
 from src.typechecking.errorissuer import *
 from src.typechecking.basictypevariable import BasicTypeVariable
+from src.typechecking.worklist import WORKLIST
 from src.typechecking.argtypevariable import ArgTypeVariable
 from src.typechecking.calltypevariable import CallTypeVariable
 from src.typechecking.contentstypevariable import ContentsTypeVariable
@@ -17,10 +19,15 @@ from src.typechecking.setattrtypevariable import SetAttrTypeVariable
 from src.typeclasses import *
 from src.traversers.astfulltraverser import AstFullTraverser
 from src.importdependent import ImportDependent
+from src.importgraph import build_import_graph, file_tree_to_list, strongly_connected_components
 from src.binopconstraints import get_op_types
 from src.pyfile import PyFile
+from src.stats import Phase_Timer
+from src.traversers.ssatraverser import Phi_Visiting
 
-class TypeInferrer(AstFullTraverser):
+log = logging.getLogger(__name__)
+
+class TypeInferrer(Phi_Visiting, AstFullTraverser):
     
     def __init__(self, error_issuer, stats):
         self.error_issuer = error_issuer
@@ -42,10 +49,16 @@ class TypeInferrer(AstFullTraverser):
     def run(self, file_tree):
         ''' file_tree is a list of pyfiles.
             TODO: Do this file find outside of this module... '''
-        # Keys are module name, values their typed dicts
-        file_list = self.file_tree_to_list(file_tree)
-        for file in file_list:
+        self.type_files(self.order_by_imports(file_tree), file_tree)
+
+    def type_files(self, files, file_tree):
+        ''' Types files in the given order. Their imports are looked up in
+            file_tree. '''
+        for file in files:
             assert isinstance(file, PyFile), "Error: Not a Python file"
+            # Typed by an earlier run
+            if file.has_been_typed():
+                continue
             dependents = self.check_dependents(file, file_tree)
             self.type_file(file, dependents) 
             
@@ -54,7 +67,7 @@ class TypeInferrer(AstFullTraverser):
             #  print(key)
             #  print(value)
             if key not in BUILTIN_TYPE_DICT:
-                print(key + ": " + str(value.get()))
+                log.debug("%s: %s", key, value.get())
             
     def check_dependents(self, file, file_tree):
         ''' Extracts all of the type variables for the imports.
@@ -75,11 +88,21 @@ class TypeInferrer(AstFullTraverser):
         return dependent_vars 
             
     def file_tree_to_list(self, file_tree):
-        file_lists = []
-        name_dicts = file_tree.values()
-        for n_dict in name_dicts:
-            file_lists.extend(n_dict.values())
-        return file_lists
+        return file_tree_to_list(file_tree)
+
+    def order_by_imports(self, file_tree):
+        ''' Orders the files so that a module is typed after the modules it
+            imports and so its imported variables are final when linked.
+            Modules which import each other are typed one after the other. '''
+        file_list = self.file_tree_to_list(file_tree)
+        files = {file.path_and_name : file for file in file_list}
+        position = {file.path_and_name : i for i, file in enumerate(file_list)}
+        ordered = []
+        for component in strongly_connected_components(build_import_graph(file_tree)):
+            # Keep file order within a cycle so runs are repeatable
+            component.sort(key = position.get)
+            ordered.extend(files[key] for key in component)
+        return ordered
             
     def type_file(self, file, dependents):   
         ''' Runs the type_checking on an individual file. '''
@@ -90,10 +113,20 @@ class TypeInferrer(AstFullTraverser):
         self.module_name = file.get_path() + "/" + file.get_name()
         self.variableTypes = root.variableTypes
         self.initialise()
+        timer = Phase_Timer()
+        propagations = WORKLIST.propagations
+        iterations = WORKLIST.iterations
+        collapsed = WORKLIST.collapsed
+        widenings = WORKLIST.widenings
+        WORKLIST.take_largest_type_set()
    #     print("-DEPENDENTS-")
    #     pprint(dependents)
         self.link_imports(dependents)
         self.visit(root)
+        self.stats.add_phase(self.module_name, "typing", timer.stop())
+        self.stats.add_solver_counts(self.module_name, WORKLIST.propagations - propagations,
+                                     WORKLIST.iterations - iterations, WORKLIST.take_largest_type_set(),
+                                     WORKLIST.collapsed - collapsed, WORKLIST.widenings - widenings)
         file.typed = True
         
     def link_imports(self, imports):
@@ -103,15 +136,6 @@ class TypeInferrer(AstFullTraverser):
                 self.variableTypes[name] = BasicTypeVariable()
             self.conduct_assignment([self.variableTypes[name]], [value], None)
     
-    def visit(self, node):
-        '''Visit a single node.  Callers are responsible for visiting children.'''
-        if hasattr(node, "phi_nodes"):
-            phis = node.phi_nodes
-            for phi in phis:
-                self.visit(phi)
-        method = getattr(self,'do_' + node.__class__.__name__)
-        return method(node)
-    
     def do_Name(self, node):
         ''' TODO: Add True/False/None to builtins. '''
         if node.id == "True" or node.id == "False":
@@ -245,8 +269,7 @@ class TypeInferrer(AstFullTraverser):
             # This is like del x.f . Do we care? Don't think so
             return
         else:
-            print("CONTEXXXXXXXXXX")
-            print(node.ctx)
+            log.error("Unknown attribute context %s", node.ctx)
             assert(False)
         return [return_type]
         
@@ -269,8 +292,7 @@ class TypeInferrer(AstFullTraverser):
             self.fun_params = [self.variableTypes[param] for param in params]
 
             self.return_variable = BasicTypeVariable()
-            for z in node.body:
-                self.visit(z)
+            self.visit_function_body(node)
             for z in node.decorator_list:
                 self.visit(z)
                     
@@ -278,15 +300,11 @@ class TypeInferrer(AstFullTraverser):
             if node.name == "__init__":
                 self.error_issuer.add_issue(InitNoneIssue(node, self.return_variable, self.module_name))
                 
-            if node.name == "f":
-                print()
-                print("Final types")
-                print(node.lineno)
+            if node.name == "f" and log.isEnabledFor(logging.DEBUG):
+                log.debug("Final types for line %s", node.lineno)
                 self.print_types()
-                print("Param types")
-                print([param.get() for param in self.fun_params])
-                print("Return types")
-                print(self.return_variable.get())
+                log.debug("Param types %s", [param.get() for param in self.fun_params])
+                log.debug("Return types %s", self.return_variable.get())
         finally:
             
             # Add the new function type
@@ -299,13 +317,24 @@ class TypeInferrer(AstFullTraverser):
             else:
                 return_types = self.return_variable
             # Create the function type
-            fun_type = BasicTypeVariable([Def_Type(self.fun_params, return_types, defaults_length, has_kwarg_vararg)])
+            fun_type = BasicTypeVariable([Def_Type(self.fun_params, return_types, defaults_length, has_kwarg_vararg,
+                                                   self.function_name(node))])
             
             # Restore parent variables
             self.variableTypes = node.stc_context.variableTypes
             self.conduct_assignment([self.variableTypes[node.name]], [fun_type], node)
             self.fun_params = old_params
             
+    def function_name(self, node):
+        ''' Names the function node by its module, the classes and functions
+            it's nested in and its line. '''
+        names = [node.name]
+        context = node.stc_context
+        while not isinstance(context, ast.Module):
+            names.append(context.name)
+            context = context.stc_context
+        return "%s:%s@%d" % (self.module_name, ".".join(reversed(names)), node.lineno)
+
     def get_defaults_length(self, arguments):
         return len(arguments.defaults)
             
@@ -361,8 +390,7 @@ class TypeInferrer(AstFullTraverser):
         self.current_class = new_class
         try:
             self.move_init_to_top(node.body, node)
-            for z in node.body:
-                self.visit(z)
+            self.visit_statements(node.body)
         finally:
     #        print("Class " + node.name + " vars")
     #        self.print_types()
@@ -432,10 +460,8 @@ class TypeInferrer(AstFullTraverser):
         for iter_typevar in iter_contents:
             self.error_issuer.add_issue(IteratorIssue(node, iter_typevar, self.module_name))
         
-        for z in node.body:
-            self.visit(z)
-        for z in node.orelse:
-            self.visit(z)
+        self.visit_statements(node.body)
+        self.visit_statements(node.orelse)
   
     def do_Tuple(self, node):
         names = []
@@ -663,8 +689,7 @@ class TypeInferrer(AstFullTraverser):
             except_type = self.visit(node.type)
             target = self.visit(node.name)
             self.conduct_assignment(target, except_type, node)
-        for z in node.body:
-            self.visit(z)
+        self.visit_statements(node.body)
     
     def do_Bytes(self, node):
         return [BasicTypeVariable([Bytes_Type()])]
@@ -675,5 +700,4 @@ class TypeInferrer(AstFullTraverser):
     
     def do_Module (self,node):
         self.stats.inc_num_modules()
-        for z in node.body:
-            self.visit(z)
\ No newline at end of file
+        self.visit_statements(node.body)
\ No newline at end of file
@@ -0,0 +1,131 @@
+from collections.abc import MutableSet
+
+class TypeTable():
+    ''' Gives every interned kind of type a small integer id, so that a set
+        of them can be held as the bits of an int.
+
+        Only types whose class sets interned are given ids. Their kind never
+        changes and any two of them with the same kind can stand in for one
+        another, so one type is kept per kind. Functions, classes, instances
+        and modules are not interned as their kinds are either unique or
+        shared by types which differ. Nor are containers and strings, as
+        each has method variables of its own which a subclass may link
+        to. '''
+
+    def __init__(self):
+        # Kind -> id
+        self.ids = {}
+        # Id -> the type kept for that kind
+        self.types = []
+
+    def id_of(self, interned_type):
+        type_id = self.ids.get(interned_type.kind)
+        if type_id is None:
+            type_id = len(self.types)
+            self.ids[interned_type.kind] = type_id
+            self.types.append(interned_type)
+        return type_id
+
+TYPE_TABLE = TypeTable()
+
+class TypeSet(MutableSet):
+    ''' A set of types. Interned types are held as the bits of an int, so
+        unions and subset tests between them are single int operations. Any
+        other types are held in an ordinary set, only made when needed. '''
+
+    __slots__ = ('bits', 'others')
+
+    def __init__(self, types = ()):
+        self.bits = 0
+        self.others = None
+        for a_type in types:
+            self.add(a_type)
+
+    def __reduce__(self):
+        # The ids only mean something in this process
+        return (TypeSet, (list(self),))
+
+    def __contains__(self, a_type):
+        if getattr(a_type, 'interned', False):
+            type_id = TYPE_TABLE.ids.get(a_type.kind)
+            return type_id is not None and bool(self.bits >> type_id & 1)
+        return self.others is not None and a_type in self.others
+
+    def __iter__(self):
+        bits = self.bits
+        type_id = 0
+        while bits:
+            if bits & 1:
+                yield TYPE_TABLE.types[type_id]
+            bits >>= 1
+            type_id += 1
+        if self.others:
+            yield from list(self.others)
+
+    def __len__(self):
+        return bin(self.bits).count('1') + (len(self.others) if self.others else 0)
+
+    def __repr__(self):
+        if not self:
+            return 'set()'
+        return '{' + ', '.join(repr(a_type) for a_type in self) + '}'
+
+    def __eq__(self, types):
+        if isinstance(types, TypeSet):
+            return self.bits == types.bits and (self.others or set()) == (types.others or set())
+        return super().__eq__(types)
+    __hash__ = None
+
+    def __bool__(self):
+        return bool(self.bits or self.others)
+
+    def add(self, a_type):
+        if a_type.interned:
+            self.bits |= 1 << TYPE_TABLE.id_of(a_type)
+            return
+        if self.others is None:
+            self.others = set()
+        self.others.add(a_type)
+
+    def discard(self, a_type):
+        if a_type.interned:
+            type_id = TYPE_TABLE.ids.get(a_type.kind)
+            if type_id is not None:
+                self.bits &= ~(1 << type_id)
+        elif self.others:
+            self.others.discard(a_type)
+
+    def clear(self):
+        self.bits = 0
+        self.others = None
+
+    def update(self, types):
+        if isinstance(types, TypeSet):
+            self.bits |= types.bits
+            if types.others:
+                if self.others is None:
+                    self.others = set()
+                self.others |= types.others
+            return
+        for a_type in types:
+            self.add(a_type)
+
+    def __ior__(self, types):
+        self.update(types)
+        return self
+
+    def __or__(self, types):
+        union = TypeSet()
+        union.update(self)
+        union.update(types)
+        return union
+    __ror__ = __or__
+
+    def issubset(self, types):
+        if isinstance(types, TypeSet):
+            if self.bits & ~types.bits:
+                return False
+            if not self.others:
+                return True
+            return types.others is not None and self.others <= types.others
+        return all(a_type in types for a_type in self)
@@ -3,6 +3,8 @@ from src.typeclasses import Any_Type, Int_Type, Float_Type
 
 class UnaryTypeVariable(BasicTypeVariable):
     
+    __slots__ = ()
+    
     def __init__(self, types = []):
         assert isinstance(types, list)
 
@@ -13,9 +15,8 @@ class UnaryTypeVariable(BasicTypeVariable):
         
     def extract_types(self, to_extract):
         ''' We want to extract the contents from each one. '''
-        assert isinstance(to_extract, BasicTypeVariable)
         extracted = set()
-        for possible_type in to_extract.get():
+        for possible_type in to_extract:
                 if isinstance(possible_type, Int_Type):
                     extracted.add(Int_Type())
                 elif isinstance(possible_type, Float_Type):
@@ -27,9 +28,6 @@ class UnaryTypeVariable(BasicTypeVariable):
     
     def update_types(self, other):
         assert isinstance(other, BasicTypeVariable)
-        extracted = self.extract_types(other)
-        if self.is_subset_of_self(BasicTypeVariable(list(extracted))):
-            return False
-        self.types |= extracted
-        return True
+        # Only the types new to other can give anything new
+        return self.add_types(self.extract_types(other.new_types_for(self)))
         
\ No newline at end of file
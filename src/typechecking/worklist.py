@@ -0,0 +1,106 @@
+from collections import Counter, deque
+
+# A variable holding more types than this, or more than MAX_TYPES_PER_CLASS
+# of one class of type (e.g. functions), is widened to Any. Sets that big
+# say little about a variable and make checking its uses, e.g. each
+# combination of argument types in a call, slow.
+MAX_TYPES = 64
+MAX_TYPES_PER_CLASS = 16
+
+class Worklist():
+    ''' Propagates changes through the constraint graph iteratively.
+
+        A variable which changes queues an update for each of its dependents
+        rather than calling them straight away. Each update is a (dependent,
+        sender) pair and is only queued once until it has been processed,
+        as the dependent reads the sender's types when it gets to it.
+
+        The queue is emptied before the outermost update returns so to
+        callers the variables are settled as they were before. '''
+    
+    def __init__(self):
+        self.pending = deque()
+        self.pending_pairs = set()
+        self.solving = False
+        # Number of updates asked for, including those already queued
+        self.propagations = 0
+        # Number of updates processed, i.e. calls to receive_update
+        self.iterations = 0
+        # Most types held by a variable after an update since the last
+        # call to take_largest_type_set
+        self.largest_type_set = 0
+        # Edges from one plain variable to another already searched for
+        # cycles during the current solve
+        self.checked_edges = set()
+        # Number of variables merged into another as part of a cycle
+        self.collapsed = 0
+        # The limits checked by needs_widening. None is no limit.
+        self.max_types = MAX_TYPES
+        self.max_types_per_class = MAX_TYPES_PER_CLASS
+        # Number of times a variable has been widened
+        self.widenings = 0
+        
+    def take_largest_type_set(self):
+        largest = self.largest_type_set
+        self.largest_type_set = 0
+        return largest
+        
+    def needs_widening(self, types):
+        ''' Whether types is too big to keep. '''
+        if self.max_types is not None and len(types) > self.max_types:
+            return True
+        if self.max_types_per_class is None or len(types) <= self.max_types_per_class:
+            return False
+        per_class = Counter(type(a_type) for a_type in types)
+        return max(per_class.values()) > self.max_types_per_class
+        
+    def add(self, dependent, sender):
+        self.propagations += 1
+        pair = (dependent, sender)
+        if pair in self.pending_pairs:
+            return
+        self.pending_pairs.add(pair)
+        self.pending.append(pair)
+        if not self.solving:
+            self.solve()
+    
+    def check_for_cycle(self, sender, dependent):
+        ''' Lazy cycle detection. Called when an update from one plain
+            variable to another left them holding the same types, which is
+            what an edge on a settled cycle looks like. Each edge is only
+            searched from once per solve, and any cycles found are merged so
+            their types stop going round. '''
+        edge = (sender, dependent)
+        if edge in self.checked_edges:
+            return
+        self.checked_edges.add(edge)
+        self.collapsed += dependent.collapse_cycles()
+    
+    def solve(self):
+        self.solving = True
+        try:
+            while self.pending:
+                pair = self.pending.popleft()
+                self.pending_pairs.remove(pair)
+                self.iterations += 1
+                dependent, sender = pair
+                dependent.receive_update(sender)
+                size = len(dependent.types)
+                if size > self.largest_type_set:
+                    self.largest_type_set = size
+        finally:
+            # Don't leave half a propagation behind if an update failed
+            self.pending.clear()
+            self.pending_pairs.clear()
+            # Holding on to the edges would keep their variables alive
+            self.checked_edges.clear()
+            self.solving = False
+
+# Shared by every type variable
+WORKLIST = Worklist()
+
+def set_type_limits(max_types, max_types_per_class):
+    ''' Sets the limits at which variables are widened. Also used to start
+        worker processes with the limits of their parent. '''
+    WORKLIST.max_types = max_types
+    WORKLIST.max_types_per_class = max_types_per_class
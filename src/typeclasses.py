@@ -1,10 +1,28 @@
+from collections import ChainMap
+from types import MappingProxyType
+
 from utils import Utils
 from src.typechecking.basictypevariable import BasicTypeVariable
 
+class Singleton_Meta(type):
+    ''' Metaclass for types without any state of their own. Calling the class
+        returns the one shared instance, made the first time it's called. '''
+    
+    def __call__(cls):
+        instance = cls.__dict__.get('instance')
+        if instance is None:
+            instance = super().__call__()
+            cls.instance = instance
+        return instance
+
 class BaseType:
     '''BaseType is the base class for all type classes.
 
     '''
+    __slots__ = ('kind', 'global_vars')
+    
+    # Whether type sets may keep one of these per kind. See TypeTable.
+    interned = False
     
     def __init__(self, kind, global_vars = {}):
         self.kind = kind
@@ -34,10 +52,16 @@ class BaseType:
     
     def get_global_var(self, var):
         ''' Returns the variables/functions contained in this class. '''
-        if var in self.global_vars:
-            return self.global_vars[var]
-        else:
-            return None
+        return self.global_vars.get(var)
+    
+    def get_own_var(self, var):
+        ''' Returns the variable for var to link to or write to. '''
+        return self.get_global_var(var)
+    
+    def shares_var(self, var):
+        ''' Whether the variable for var is shared with other types and so
+            never changes. '''
+        return False
         
     def has_any_base(self):
         return False
@@ -51,7 +75,52 @@ class BaseType:
     def get_return_types(self):
         return None
 
-class Any_Type(BaseType):    
+class Shared_Vars():
+    ''' For types whose variables are the same for every instance, such as
+        the methods of str. They are built by build_vars for the first
+        instance, which serves as self in the shared methods, and shared by
+        every instance after it.
+        
+        The shared variables are read only: nothing links to them or writes
+        to them, so they never change and never gain dependents. Each
+        instance overlays them, as Class_Type.new_instance does, and is given
+        its own copy of a variable before it is linked to or written. '''
+    __slots__ = ()
+    
+    def init_shared_vars(self):
+        self.global_vars = ChainMap({}, self.get_shared_vars())
+        
+    def get_shared_vars(self):
+        shared_vars = self.__class__.__dict__.get('shared_vars')
+        if shared_vars is None:
+            shared_vars = self.build_vars()
+            self.__class__.shared_vars = shared_vars
+        return shared_vars
+    
+    def get_own_var(self, var):
+        own_vars = self.global_vars.maps[0]
+        own_var = own_vars.get(var)
+        if own_var is None:
+            shared_var = self.global_vars.maps[1].get(var)
+            if shared_var is None:
+                return None
+            own_var = BasicTypeVariable(list(shared_var.get()))
+            own_vars[var] = own_var
+        return own_var
+    
+    def shares_var(self, var):
+        return var not in self.global_vars.maps[0] and var in self.global_vars.maps[1]
+    
+    def get_vars(self):
+        ''' All of the variables, e.g. for a subclass to link to, so this
+            instance is given its own copy of each first. '''
+        for var in self.global_vars.maps[1]:
+            self.get_own_var(var)
+        return self.global_vars
+        
+class Any_Type(BaseType, metaclass=Singleton_Meta):    
+    __slots__ = ()
+    interned = True
     def __init__(self):
         BaseType.__init__(self,'Any')
         
@@ -64,20 +133,28 @@ class Any_Type(BaseType):
     def get_return_types(self):
         return BasicTypeVariable([Any_Type()])
 
-class Bool_Type(BaseType):    
+class Bool_Type(BaseType, metaclass=Singleton_Meta):    
     ''' Contains no varibles/functions. '''
+    __slots__ = ()
+    interned = True
     def __init__(self):
         BaseType.__init__(self,'Bool')
 
-class Builtin_Type(BaseType):    
+class Builtin_Type(BaseType, metaclass=Singleton_Meta):    
+    __slots__ = ()
+    interned = True
     def __init__(self):
         BaseType.__init__(self,'Builtin')
 
-class Bytes_Type(BaseType):    
+class Bytes_Type(Shared_Vars, BaseType):    
+    __slots__ = ()
     def __init__(self):
         BaseType.__init__(self,'Bytes')
         
-        self.global_vars = { # capitalize(self) -> str
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return { # capitalize(self) -> str
                             'capitalize' : BasicTypeVariable([Def_Type([],
                                                                     BasicTypeVariable([self]),
                                                                     0)]),
@@ -353,6 +430,7 @@ class Bytes_Type(BaseType):
         return BasicTypeVariable([self])
         
 class Callable_Type():
+    __slots__ = ()
     def __init__(self):
         self.supports_calling = True
         # Variables used for analysis of callable types
@@ -379,6 +457,7 @@ class Attribute_Type():
 
 class Class_Base():    
     ''' The types of global class variables are kept here. '''
+    __slots__ = ()
     def __init__(self):
         self.any_base_class = False
     
@@ -392,6 +471,8 @@ class Class_Type(Class_Base, BaseType):
     
         TODO: Bultin functions such as __class__ .
         TODO: Only allow static functions to be called from here. '''
+    __slots__ = ('any_base_class', 'name', 'has_call_func', 'call_param_types', 'call_return_types',
+                 'parameter_types')
     def __init__(self, name, global_vars, has_call_func=False):
         ''' global_vars are variables accessible outside of the class. ''' 
         kind = 'Class Def: %s' % name
@@ -448,12 +529,16 @@ class Class_Type(Class_Base, BaseType):
     def get_return_types(self):
         ''' We want to return a new instance every time. '''
       #  return BasicTypeVariable([self])
-        # Need to copy as it is liable to change
-        return BasicTypeVariable([Class_Instance(self.name, self.global_vars.copy(), \
-                              self.has_any_base())])
+        return BasicTypeVariable([self.new_instance()])
+    
+    def new_instance(self):
+        ''' The instance sees the class's variables rather than a copy of
+            them. Variables set on the instance are kept in its own dict. '''
+        return Class_Instance(self.name, ChainMap({}, self.global_vars), self.has_any_base())
     
 class Class_Instance(Class_Base, BaseType):
     ''' Used to represent initialised classes. '''
+    __slots__ = ('any_base_class', 'name')
     def __init__(self, name, global_vars, any_base):
         kind = 'Class Instance: %s' % name
         Class_Base.__init__(self)
@@ -476,16 +561,23 @@ class Class_Instance(Class_Base, BaseType):
         return set([Any_Type()])
             
 class Module_Type(Class_Base, BaseType):
+    __slots__ = ('any_base_class',)
     def __init__(self, global_vars):
         kind = 'Module()'
         BaseType.__init__(self, kind, global_vars)
         Class_Base.__init__(self)
 
 class Def_Type(Callable_Type, BaseType):    
-    ''' TODO: deal with kind. '''
-    def __init__(self, parameter_types, return_types, arg_default_length, is_kwarg_vaarg=False):
-        kind = 'Def(%s)' % id(parameter_types)
+    ''' The kind of a function defined in the code being checked comes from
+        its name, the place it's defined, so it's the same in every process.
+        Builtin functions are unnamed and their kind is only unique within
+        the process which made them. '''
+    __slots__ = ('supports_calling', 'parameter_types', 'return_types', 'arg_default_length',
+                 'is_kwarg_vaarg', 'name')
+    def __init__(self, parameter_types, return_types, arg_default_length, is_kwarg_vaarg=False, name=None):
+        kind = Def_Type.kind_for(name if name is not None else id(parameter_types))
         BaseType.__init__(self, kind)
+        self.name = name
         Callable_Type.__init__(self)
         self.parameter_types = parameter_types
         self.return_types = return_types
@@ -504,7 +596,12 @@ class Def_Type(Callable_Type, BaseType):
     def get_parameter_types(self):
         return self.parameter_types
 
+    @staticmethod
+    def kind_for(name):
+        return 'Def(%s)' % name
+
 class Inference_Failure(BaseType):
+    __slots__ = ('node',)
     def __init__(self, kind, node):
         BaseType.__init__(self,kind)
         u = Utils()
@@ -516,31 +613,37 @@ class Inference_Failure(BaseType):
     __str__ = __repr__
 
 class Circular_Assignment(Inference_Failure):
+    __slots__ = ()
     def __init__(self,node):
         kind = 'Circular_Assn'
         Inference_Failure.__init__(self,kind,node)
         
 class Inference_Error(Inference_Failure):
+    __slots__ = ()
     def __init__(self,node):
         kind = 'Inf_Err'
         Inference_Failure.__init__(self,kind,node)
 
 class Recursive_Inference(Inference_Failure):
+    __slots__ = ()
     def __init__(self,node):
         kind = 'Recursive_Inf'
         Inference_Failure.__init__(self,kind,node)
         
 class Unknown_Type(Inference_Failure):
+    __slots__ = ()
     def __init__(self,node):
         kind = 'Uknown_Type' # Short, for traces.
         Inference_Failure.__init__(self,kind,node)
         
 class Unknown_Arg_Type(Inference_Failure):
+    __slots__ = ()
     def __init__(self,node):
         kind = 'Unkown_Arg_Type'
         Inference_Failure.__init__(self,kind,node)
         
 class Container_Type():
+    __slots__ = ()
     def __init__(self, node, contents, c_types):
         ''' contents is used to for assignment and anything which may find
             knowing the elements of the list helpful. '''
@@ -575,15 +678,19 @@ class Container_Type():
         ''' Override this. '''
         raise NotImplementedError
         
-class Dict_Type(Container_Type, Class_Base, BaseType):
+class Dict_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
     ''' TODO: Add values contained in a dict. '''
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         kind = 'dict(@%s)'
         BaseType.__init__(self, kind)
         Class_Base.__init__(self)
         Container_Type.__init__(self, None, [], set([Any_Type()]))
         
-        self.global_vars = {
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return {
                             # clear(self) -> None
                             'clear' : BasicTypeVariable([Def_Type([  ],
                                                          BasicTypeVariable([None_Type()]),
@@ -693,15 +800,19 @@ class Dict_Type(Container_Type, Class_Base, BaseType):
     def define_kind(self):
         self.kind = 'dict(%s)' % repr(self.content_types)
         
-class Set_Type(Container_Type, Class_Base, BaseType):
+class Set_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
     ''' TODO: Add new types when the function append is called or similar. '''
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         kind = 'set({})'
         BaseType.__init__(self, kind)
         Container_Type.__init__(self, None, [], set())
         Class_Base.__init__(self)
         
-        self.global_vars = {
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return {
                             # add(self, element: T) -> None
                             'add' : BasicTypeVariable([Def_Type([ BasicTypeVariable([Any_Type()]) ],
                                                          BasicTypeVariable([None_Type()]),
@@ -829,15 +940,19 @@ class Set_Type(Container_Type, Class_Base, BaseType):
     def define_kind(self):
         self.kind = 'set(%s)' % repr(self.content_types)
 
-class List_Type(Container_Type, Class_Base, BaseType):
+class List_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
     ''' TODO: Add new types when the function append is called or similar. '''
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         kind = 'List({})'
         BaseType.__init__(self, kind)
         Container_Type.__init__(self, None, [], set())
         Class_Base.__init__(self)
         
-        self.global_vars = {#clear(self) -> None
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return {#clear(self) -> None
                             'clear' : BasicTypeVariable([Def_Type([],
                                                                     BasicTypeVariable([None_Type()]),
                                                                     0)]),
@@ -956,15 +1071,19 @@ class List_Type(Container_Type, Class_Base, BaseType):
     def define_kind(self):
         self.kind = 'List(%s)' % repr(self.content_types)
         
-class Generator_Type(Container_Type, Class_Base, BaseType):
+class Generator_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
     ''' TODO: Add new types when the function append is called or similar. '''
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         kind = 'Generator({})'
         Container_Type.__init__(self, None, [], set())
         Class_Base.__init__(self)
         BaseType.__init__(self, kind)
         
-        self.global_vars = { # __init__(self, ?)
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return { # __init__(self, ?)
                             '__init__' : BasicTypeVariable([Def_Type([ Any_Type() ],
                                                                     BasicTypeVariable([None_Type()]),
                                                                     1)]),                          
@@ -994,14 +1113,18 @@ class Generator_Type(Container_Type, Class_Base, BaseType):
         self.kind = 'Generator(%s)' % repr(self.content_types)
     
     
-class Tuple_Type(Container_Type, Class_Base, BaseType):
+class Tuple_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         kind = 'Tuple({})'
         Container_Type.__init__(self, None, [], set())
         Class_Base.__init__(self)
         BaseType.__init__(self, kind)
         
-        self.global_vars = {
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return {
                             # __getitem__(self, x: int) -> Any
                             '__getitem__' : BasicTypeVariable([Def_Type([Int_Type()],
                                                                     BasicTypeVariable([Any_Type()]),
@@ -1050,32 +1173,42 @@ class Tuple_Type(Container_Type, Class_Base, BaseType):
     def define_kind(self):
         self.kind = 'Tuple(%s)' % repr(self.content_types)
 
-class None_Type(BaseType):
+class None_Type(BaseType, metaclass=Singleton_Meta):
+    __slots__ = ()
+    interned = True
     def __init__(self):
         BaseType.__init__(self,'None')
 
 class Num_Type(BaseType):
+    __slots__ = ()
+    interned = True
     def __init__(self, type_class):
         BaseType.__init__(self,
             kind = type_class.__name__.capitalize())
 
 ''' Float and Int do not really get instantiated, but rather are used for
     for comparison using the kind. '''
-class Float_Type(Num_Type):
+class Float_Type(Num_Type, metaclass=Singleton_Meta):
+    __slots__ = ()
     def __init__(self):
         Num_Type.__init__(self, float)
 
-class Int_Type(Num_Type):
+class Int_Type(Num_Type, metaclass=Singleton_Meta):
+    __slots__ = ()
     def __init__(self):
         Num_Type.__init__(self, int)
         
-class String_Type(Container_Type, Class_Base, BaseType):
+class String_Type(Shared_Vars, Container_Type, Class_Base, BaseType):
+    __slots__ = ('any_base_class', 'contents', 'content_types')
     def __init__(self):
         BaseType.__init__(self, 'String')
         Class_Base.__init__(self)
         self.content_types = set([self])
                
-        self.global_vars = {  # capitalize(self) -> str
+        self.init_shared_vars()
+        
+    def build_vars(self):
+        return {  # capitalize(self) -> str
                             'capitalize' : BasicTypeVariable([Def_Type([],
                                                                     BasicTypeVariable([self]),
                                                                     0)]),
@@ -1364,7 +1497,9 @@ class String_Type(Container_Type, Class_Base, BaseType):
         
 # Create singleton instances of simple types.
 
-BUILTIN_TYPE_DICT = {
+# Read only. Modules read the builtins through a Scope, which gives each
+# module its own variables for them.
+BUILTIN_TYPE_DICT = MappingProxyType({
   # builtin double underscores
   '__version__' : BasicTypeVariable([Any_Type()]),
   '__loader__': BasicTypeVariable([Any_Type()]),
@@ -1732,7 +1867,7 @@ BUILTIN_TYPE_DICT = {
   'bool' : BasicTypeVariable([ Bool_Type() ] ),
             # Classes
   'object' : BasicTypeVariable([Class_Type("object", {}, False)])
-} 
+})
 
 
 ITERATOR_TYPES = BasicTypeVariable([List_Type(), Set_Type(), Tuple_Type(), Dict_Type(), String_Type(), Bytes_Type(), Generator_Type()])
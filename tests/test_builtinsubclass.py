@@ -0,0 +1,72 @@
+''' Checks that overriding a method in a subclass of a builtin type doesn't
+    change the method for every other instance of the builtin type. Run
+    from the top level directory with
+
+        python3 -m unittest discover tests '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# The modules in src are also imported by name, as when running src/main.py
+TOP_LEVEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [TOP_LEVEL, os.path.join(TOP_LEVEL, "src")]
+
+import src.extractpysfromdirectory as file_extractor
+from src.importgraph import file_tree_to_list
+from src.stats import Statistics
+from src.typechecking.errorissuer import ErrorIssuer
+from src.typechecking.typeinferrer import TypeInferrer
+
+class Builtin_Subclass_Test(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        
+    def tearDown(self):
+        # get_pys changes into the directory
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+        
+    def type_modules(self, sources):
+        ''' Writes and types the modules in sources, which maps file names to
+            their source. Returns the names of the modules mapped to their
+            typed trees. '''
+        for file_name, source in sources.items():
+            with open(os.path.join(self.directory, file_name), 'w') as f:
+                f.write(source)
+        file_tree = file_extractor.get_pys(self.directory)
+        TypeInferrer(ErrorIssuer(), Statistics()).run(file_tree)
+        return {file.get_name() : file.get_source() for file in file_tree_to_list(file_tree)}
+    
+    def kinds_of(self, module, name):
+        return {var_type.kind for var_type in module.variableTypes[name].get()}
+    
+    def test_list_override_stays_in_subclass(self):
+        modules = self.type_modules({
+            "a.py" : "class Foo(list):\n"
+                     "    def append(self, x):\n"
+                     "        return 3\n"
+                     "\n"
+                     "z = Foo().append(1)\n",
+            "b.py" : "def g():\n"
+                     "    xs = []\n"
+                     "    return xs.append(1)\n"
+                     "\n"
+                     "y = g()\n"})
+        self.assertIn("Int", self.kinds_of(modules["a"], "z"))
+        self.assertEqual({"None"}, self.kinds_of(modules["b"], "y"))
+    
+    def test_str_override_stays_in_subclass(self):
+        modules = self.type_modules({
+            "a.py" : "class Name(str):\n"
+                     "    def upper(self):\n"
+                     "        return 3\n",
+            "b.py" : "y = 'abc'.upper()\n"})
+        self.assertNotIn("Int", self.kinds_of(modules["b"], "y"))
+
+if __name__ == '__main__':
+    unittest.main()